@@ -26,7 +26,18 @@ class Step2Orchestrator(BKOrchestratorAgent):
     async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
 
         params = [{"problem_statement": self.fixed_inputs.get("problem_statement")} for fs in ffs]
-        children, child_errors = await self.invoke_many_agent(Step2ParallelSubAgent, params, concurrency=self.concurrency)
+        children: Dict[str, Any] = {}
+        child_errors: List[Dict[str, Any]] = []
+        done = 0
+        # Stream children as they finish so aggregation overlaps with the slowest slices
+        async for name, child_ctx, failure in self.invoke_many_agent_streaming(Step2ParallelSubAgent, params, concurrency=self.concurrency):
+            done += 1
+            if failure is not None:
+                child_errors.append(failure)
+                continue
+            children[name] = child_ctx
+            content = types.Content(role="model", parts=[types.Part(text=f"Slice {done}/{len(params)} completed: {name}")])
+            yield Event(author=self.name, content=content, partial=True)
 
         if child_errors:
             # persist full errors
@@ -4,6 +4,7 @@ from __future__ import annotations
 import asyncio
 import concurrent.futures
 import inspect
+import os
 import threading
 from contextlib import asynccontextmanager, AsyncExitStack, aclosing
 from typing import Any, Dict, List, Optional, AsyncIterator
@@ -14,27 +15,57 @@ from google.genai import types
 from langchain_core.messages import AIMessage
 from langchain_core.runnables import RunnableLambda
 
+try:
+    import uvloop
+except ImportError:  # optional: not available on Windows, fall back to the stock loop
+    uvloop = None
+
+
+def new_event_loop() -> asyncio.AbstractEventLoop:
+    """uvloop when installed, stdlib selector loop otherwise."""
+    if uvloop is not None:
+        return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
+
 
 class _Pipe:
-    """Simple pipe to support `llm | other` and `other | llm`."""
-    def __init__(self, left, right):
-        self.left = left
-        self.right = right
+    """Simple pipe to support `llm | other` and `other | llm`; nested pipes are flattened into one stage list."""
+    def __init__(self, *stages):
+        self.stages: List[Any] = []
+        for stage in stages:
+            if isinstance(stage, _Pipe):
+                self.stages.extend(stage.stages)
+            else:
+                self.stages.append(stage)
+
+    def __or__(self, other):
+        return _Pipe(self, other)
+
+    def __ror__(self, other):
+        return _Pipe(other, self)
 
     def invoke(self, x):
-        y = self.left.invoke(x)
-        return self.right.invoke(y)
+        for stage in self.stages:
+            x = stage.invoke(x)
+        return x
 
     async def ainvoke(self, x):
-        y = await self.left.ainvoke(x)
-        return await self.right.ainvoke(y)
+        for stage in self.stages:
+            x = await stage.ainvoke(x)
+        return x
 
 
 class _LoopThread:
     """Background event loop living on a dedicated thread for sync calls from async contexts."""
     def __init__(self, default_timeout: Optional[float] = None):
         self.default_timeout = default_timeout
-        self.loop = asyncio.new_event_loop()
+        self.loop = new_event_loop()
+        # Bound run_in_executor(None, ...) usage: the stdlib default allows up to min(32, cpu_count() + 4) threads
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(8, os.cpu_count() or 4),
+            thread_name_prefix="adkllm",
+        )
+        self.loop.set_default_executor(self._executor)
         self._stopped = threading.Event()
         self.t = threading.Thread(target=self._run, daemon=True)
         self.t.start()
@@ -45,17 +76,41 @@ class _LoopThread:
         self._stopped.set()
 
     def run_sync(self, coro, timeout: Optional[float] = None):
-        fut = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        """Run `coro` on the background loop and block for its result.
+
+        Binds the task's completion straight to a threading.Event instead of going
+        through run_coroutine_threadsafe's concurrent.futures.Future chaining.
+        """
+        done = threading.Event()
+        outcome: Dict[str, Any] = {}
+
+        def _on_done(task: asyncio.Task):
+            if task.cancelled():
+                outcome["exc"] = asyncio.CancelledError()
+            elif task.exception() is not None:
+                outcome["exc"] = task.exception()
+            else:
+                outcome["result"] = task.result()
+            done.set()
+
+        def _start():
+            task = self.loop.create_task(coro)
+            outcome["task"] = task
+            task.add_done_callback(_on_done)
+
+        self.loop.call_soon_threadsafe(_start)
         to = self.default_timeout if timeout is None else timeout
-        try:
-            return fut.result(timeout=to)
-        except concurrent.futures.TimeoutError as e:
-            fut.cancel()
-            try:
-                fut.result(timeout=1.0)
-            except Exception:
-                pass
-            raise TimeoutError("Background event-loop call timed out") from e
+        if not done.wait(timeout=to):
+            def _cancel():
+                task = outcome.get("task")
+                if task is not None:
+                    task.cancel()
+            self.loop.call_soon_threadsafe(_cancel)
+            done.wait(timeout=1.0)
+            raise TimeoutError("Background event-loop call timed out")
+        if "exc" in outcome:
+            raise outcome["exc"]
+        return outcome.get("result")
 
     def close(self):
         if not self.loop.is_closed():
@@ -68,31 +123,40 @@ class _LoopThread:
             self.loop.close()
         except Exception:
             pass
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def _aclose_runner(runner: Runner) -> None:
+    """Best-effort close of a long-lived Runner and any client/session it holds.
+
+    Runs once per Runner (at ADKLLM close), not per call. Targets are resolved at close
+    time rather than at construction so lazily created clients are still caught.
+    """
+    targets = [runner] + [getattr(runner, attr, None) for attr in ("client", "_client", "session", "_session")]
+    for obj in targets:
+        if obj is None:
+            continue
+        close = getattr(obj, "aclose", None) or getattr(obj, "close", None)
+        if not callable(close):
+            continue
+        try:
+            res = close()
+            if inspect.isawaitable(res):
+                await res
+        except Exception:
+            pass
 
 
 @asynccontextmanager
-async def _runner_stream(
+async def _stream_once(
     runner: Runner,
     *,
     user_id: str,
     session_id: str,
     content: types.Content,
 ) -> AsyncIterator[AsyncIterator]:
-    """One-stop CM that ensures both Runner and its event stream are always closed."""
+    """Ensures the per-call event stream is always closed; the Runner itself stays alive."""
     async with AsyncExitStack() as stack:
-        # Enter runner context if it supports async context mgmt
-        try:
-            await stack.enter_async_context(runner)  # type: ignore[misc]
-        except Exception:
-            # Fallback: best-effort close/aclose on exit
-            async def _close_runner():
-                close = getattr(runner, "aclose", None) or getattr(runner, "close", None)
-                if close:
-                    res = close()
-                    if inspect.isawaitable(res):
-                        await res
-            stack.push_async_callback(_close_runner)
-
         agen = runner.run_async(
             user_id=user_id,
             session_id=session_id,
@@ -122,30 +186,12 @@ async def _runner_stream(
                         except Exception:
                             pass
 
-        # Defensive: try to close obvious session attrs if Runner didn't
-        async def _safe_close_possible_sessions(r):
-            for attr in ("client", "_client", "session", "_session"):
-                obj = getattr(r, attr, None)
-                if obj is None:
-                    continue
-                for meth in ("aclose", "close"):
-                    fn = getattr(obj, meth, None)
-                    if callable(fn):
-                        res = fn()
-                        if inspect.isawaitable(res):
-                            try:
-                                await res
-                            except Exception:
-                                pass
-        try:
-            await _safe_close_possible_sessions(runner)
-        except Exception:
-            pass
-
 
 class ADKLLM(RunnableLambda):
     """LangChain Runnable that talks to a Google ADK Agent via Runner, with safe cleanup."""
     _shared_bg: Optional[_LoopThread] = None
+    # role -> rollup header; None routes the message into the System block
+    _ROLE_TAGS: Dict[str, Optional[str]] = {"system": None, "assistant": "Assistant", "user": "User"}
 
     def __init__(
         self,
@@ -167,6 +213,8 @@ class ADKLLM(RunnableLambda):
         self.timeout_s = timeout_s
         self.include_role_headers = include_role_headers
         self.max_context_chars = max_context_chars
+        self._runner: Optional[Runner] = None
+        self._runner_lock = threading.Lock()
 
         if use_shared_loop:
             if ADKLLM._shared_bg is None:
@@ -184,7 +232,20 @@ class ADKLLM(RunnableLambda):
             cls._shared_bg.close()
             cls._shared_bg = None
 
+    async def aclose(self):
+        runner, self._runner = self._runner, None
+        if runner is not None:
+            await _aclose_runner(runner)
+        if self._own_loop and self._bg:
+            self._bg.close()
+
     def close(self):
+        runner, self._runner = self._runner, None
+        if runner is not None and self._bg:
+            try:
+                self._bg.run_sync(_aclose_runner(runner), timeout=5.0)
+            except Exception:
+                pass
         if self._own_loop and self._bg:
             self._bg.close()
 
@@ -213,48 +274,55 @@ class ADKLLM(RunnableLambda):
         return s
 
     def _rollup_as_single_user_turn(self, messages: List[Dict[str, str]]) -> str:
+        tagged = self.include_role_headers
+        role_tags = self._ROLE_TAGS
         sys_chunks: List[str] = []
-        ctx_chunks: List[tuple[str, str]] = []
+        ctx_chunks: List[str] = []
         last_user: Optional[str] = None
+        last_idx = len(messages) - 1
 
         for i, m in enumerate(messages):
             role = (m.get("role") or "user").lower()
             text = m.get("content", "")
-            is_last = i == len(messages) - 1
-            if is_last and role == "user":
+            if i == last_idx and role == "user":
                 last_user = text
+                continue
+            tag = role_tags.get(role, "Context")
+            if tag is None:
+                sys_chunks.append(text)
             else:
-                if role == "system":
-                    sys_chunks.append(text)
-                elif role == "assistant":
-                    ctx_chunks.append(("Assistant", text))
-                elif role == "user":
-                    ctx_chunks.append(("User", text))
-                else:
-                    ctx_chunks.append(("Context", text))
+                ctx_chunks.append(f"{tag}:\n{text}" if tagged else text)
 
         parts: List[str] = []
-        if self.include_role_headers:
-            if sys_chunks:
-                parts.append("System:\n" + "\n\n".join(sys_chunks))
-            if ctx_chunks:
-                blocks = [f"{tag}:\n{txt}" for tag, txt in ctx_chunks]
-                parts.append("Context:\n" + "\n\n".join(blocks))
-            if last_user is None:
-                parts.append("User:\nPlease continue from where you left off.")
-            else:
-                parts.append("User:\n" + last_user)
+        if sys_chunks:
+            parts.append(("System:\n" if tagged else "") + "\n\n".join(sys_chunks))
+        if ctx_chunks:
+            parts.append(("Context:\n" if tagged else "") + "\n\n".join(ctx_chunks))
+        if tagged:
+            parts.append("User:\n" + (last_user if last_user is not None else "Please continue from where you left off."))
         else:
-            if sys_chunks:
-                parts.append("\n\n".join(sys_chunks))
-            if ctx_chunks:
-                parts.append("\n\n".join(txt for _, txt in ctx_chunks))
             parts.append(last_user or "Please continue from where you left off.")
 
         stitched = "\n\n".join(parts).strip()
         return self._truncate(stitched)
 
+    def _rollup_prompt(self, prompt: str) -> str:
+        """Same result as _rollup_as_single_user_turn for a lone user prompt, without the message wrapping."""
+        if self.include_role_headers:
+            stitched = "User:\n" + prompt
+        else:
+            stitched = prompt or "Please continue from where you left off."
+        return self._truncate(stitched.strip())
+
     # ---------- core IO ----------
+    def _get_runner(self) -> Runner:
+        """One Runner per ADKLLM, built on first use and closed by close()/aclose()."""
+        if self._runner is None:
+            with self._runner_lock:
+                if self._runner is None:
+                    self._runner = Runner(agent=self.agent, app_name=self.app_name, session_service=self.session_service)
+        return self._runner
+
     async def _run_once(self, message_text: str) -> str:
         final_text = ""
 
@@ -262,20 +330,20 @@ class ADKLLM(RunnableLambda):
             nonlocal final_text
             content = types.Content(role="user", parts=[types.Part(text=message_text)])
 
-            runner = Runner(agent=self.agent, app_name=self.app_name, session_service=self.session_service)
-
-            async with _runner_stream(
-                runner,
+            async with _stream_once(
+                self._get_runner(),
                 user_id=self.user_id,
                 session_id=self.session_id,
                 content=content,
             ) as agen:
                 async for ev in agen:
-                    if ev.is_final_response() and ev.content and ev.content.parts:
-                        part = ev.content.parts[0]
-                        txt = getattr(part, "text", None)
-                        if isinstance(txt, str):
-                            final_text = txt
+                    if not ev.is_final_response() or not (ev.content and ev.content.parts):
+                        continue
+                    txt = ev.content.parts[0].text
+                    if isinstance(txt, str):
+                        final_text = txt
+                        # text-only agent: the first final text is the answer; stop pulling (stream is aclosed)
+                        break
 
         if self.timeout_s:
             await asyncio.wait_for(_do(), timeout=self.timeout_s)
@@ -284,8 +352,10 @@ class ADKLLM(RunnableLambda):
         return final_text
 
     async def _ainvoke_impl(self, messages_or_prompt: Any) -> AIMessage:
-        messages = self._normalize_messages(messages_or_prompt)
-        rolled = self._rollup_as_single_user_turn(messages)
+        if isinstance(messages_or_prompt, str):
+            rolled = self._rollup_prompt(messages_or_prompt)
+        else:
+            rolled = self._rollup_as_single_user_turn(self._normalize_messages(messages_or_prompt))
         text = await self._run_once(rolled)
         return AIMessage(content=text or "")
 
@@ -293,22 +363,26 @@ class ADKLLM(RunnableLambda):
     async def ainvoke(self, messages_or_prompt: Any) -> AIMessage:
         return await self._ainvoke_impl(messages_or_prompt)
 
+    def invoke_sync(self, messages_or_prompt: Any) -> AIMessage:
+        """Sync call for callers that know no event loop is running: starts a temporary one."""
+        return asyncio.run(self._ainvoke_impl(messages_or_prompt), loop_factory=new_event_loop)
+
+    def invoke_in_running_loop(self, messages_or_prompt: Any) -> AIMessage:
+        """Sync call for callers already inside an event loop: offloads to the background loop."""
+        return self._bg.run_sync(self._ainvoke_impl(messages_or_prompt), timeout=self.timeout_s)
+
     def invoke(self, messages_or_prompt: Any) -> AIMessage:
         """Sync facade:
         - If already inside an event loop, submit to the background loop.
         - Otherwise, start a temporary loop with asyncio.run.
+        Callers that already know which case applies can use invoke_sync() /
+        invoke_in_running_loop() directly and skip the probe.
         """
         try:
             asyncio.get_running_loop()
         except RuntimeError:
-            # No running loop: safe to use asyncio.run
-            return asyncio.run(self._ainvoke_impl(messages_or_prompt))
-        else:
-            # Running loop present: offload to background loop
-            return self._bg.run_sync(
-                self._ainvoke_impl(messages_or_prompt),
-                timeout=self.timeout_s if self.timeout_s is not None else None,
-            )
+            return self.invoke_sync(messages_or_prompt)
+        return self.invoke_in_running_loop(messages_or_prompt)
 
 import atexit
 
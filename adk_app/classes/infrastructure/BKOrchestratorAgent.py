@@ -1,33 +1,39 @@
 import re, os
+from functools import lru_cache
 from sys import _getframe
 from pydantic.v1 import Field, BaseModel
 from classes.infrastructure.PromptOrchestratorAgent import PromptOrchestratorAgent
-from typing import List, Optional, Callable, Dict, Any, Sequence
+from classes.models.models import StaticReportSection
+from typing import List, Optional, Callable, Dict, Any, Iterator, Sequence
+
+_SECTION_RE = re.compile(r"### ::(\w+)\n(.*?)(?=\n### ::|\Z)", re.DOTALL)  # greedy till next section or end
+
+
+@lru_cache(maxsize=512)
+def _minitoken_re(target_key: str, is_paragraph: bool) -> re.Pattern:
+    if is_paragraph:
+        # match until next "- **[", or "### ::", or end of string
+        pattern = rf'-\s+\*\*\[{re.escape(target_key)}\]\*\*:?\s*(.*?)(?=-\s+\*\*\[|### ::|$)'
+    else:
+        pattern = rf'-\s+\*\*\[{re.escape(target_key)}\]\*\*:(.*?)(?:\n|<br>)'
+    return re.compile(pattern, flags=re.DOTALL)
+
 
 class BKOrchestratorAgent(PromptOrchestratorAgent):
     upper_horizontal_threshold:int = 30
     max_potential_file_length:int = 250 # 200 code lines + 50 lines of comments
 
-    def parse_static_report_sections(self, text: str) -> List:
+    def parse_static_report_sections(self, text: str) -> List[StaticReportSection]:
         SECTION_TITLE_MAP = {
         }
-        pattern = r"### ::(\w+)\n(.*?)(?=\n### ::|\Z)"  # greedy till next section or end
-        matches = re.findall(pattern, text, re.DOTALL)
-        StaticReportSection = self.generate_pydantic_model([
-            ("id", str, Field("", description="Specification ID")),
-            ("title", str, Field("", description="Section Title")),
-            ("content", str, Field("", description="Content")),
-        ])
-        sections = []
-        for section_id, content in matches:
-            title = SECTION_TITLE_MAP.get(section_id, section_id)
-            sections.append(StaticReportSection(
+        return [
+            StaticReportSection(
                 id=section_id,
-                title=title,
+                title=SECTION_TITLE_MAP.get(section_id, section_id),
                 content=content.strip()
-            ))
-
-        return sections
+            )
+            for section_id, content in _SECTION_RE.findall(text)
+        ]
 
     def print_static_report_sections(self, sections: List) -> str:
         output = []
@@ -42,19 +48,15 @@ class BKOrchestratorAgent(PromptOrchestratorAgent):
         - If is_paragraph=False, it ends at \n or <br>
         - If is_paragraph=True, it captures until the next `- **[` or `### ::` or end of string
         """
-        if is_paragraph:
-            # match until next "- **[", or "### ::", or end of string
-            pattern = rf'-\s+\*\*\[{re.escape(target_key)}\]\*\*:?\s*(.*?)(?=-\s+\*\*\[|### ::|$)'
-        else:
-            pattern = rf'-\s+\*\*\[{re.escape(target_key)}\]\*\*:(.*?)(?:\n|<br>)'
-
-        match = re.search(pattern, input_string, flags=re.DOTALL)
+        match = _minitoken_re(target_key, is_paragraph).search(input_string)
         return match.group(1).strip() if match else ""
 
-    def _batch(self, items: Sequence[Any], size: int) -> List[Sequence[Any]]:
+    def _batch(self, items: Sequence[Any], size: int) -> Iterator[Sequence[Any]]:
         if size <= 0:
-            return [list(items)]
-        return [items[i : i + size] for i in range(0, len(items), size)]
+            yield list(items)
+            return
+        for i in range(0, len(items), size):
+            yield items[i : i + size]
 
     def _should_continue(self, items, prev_len):
         if not items:
@@ -1,9 +1,15 @@
 # PromptOrchestratorAgent
 
+import concurrent.futures
 import json
+import multiprocessing
+import os
+import sys
 import traceback
-from typing import Dict, List, MutableMapping, Optional, AsyncGenerator, Callable, Any, Sequence, Tuple, Type
+from functools import lru_cache
+from typing import AsyncIterator, Awaitable, Dict, List, MutableMapping, Optional, AsyncGenerator, Callable, Any, Sequence, Tuple, Type
 import uuid
+from pydantic import PrivateAttr
 from typing_extensions import override
 from google.adk.agents import BaseAgent, LlmAgent
 from google.adk.agents.invocation_context import InvocationContext
@@ -16,7 +22,54 @@ import collections.abc as cabc
 
 from classes.infrastructure.ADKLLM import ADKLLM
 from classes.infrastructure.StructuredOutputChain import create_structured_output_chain
-from classes.infrastructure.PromptOrchestratorSidekick import PromptOrchestratorSidekick
+from classes.infrastructure.PromptOrchestratorSidekick import PromptOrchestratorSidekick, parse_offline
+
+def _default_logger(tag: str, payload: dict) -> None:
+    """Default logger compatible with logger(tag, payload)."""
+    print(f"[{tag}] {payload}")
+
+# Small dedicated pool so a burst of failing children doesn't serialize tracebacks on the loop
+_ERR_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="err-serialize")
+
+def _serialize_child_error(e: BaseException, param: Any) -> Tuple[str, str, str]:
+    """Returns (full traceback, last 12 traceback lines, param preview capped at 800 chars)."""
+    tb_full = "".join(traceback.format_exception(type(e), e, e.__traceback__))
+    tail_lines = tb_full.strip().splitlines()[-12:]
+    tb_tail = "\n".join(tail_lines)
+    try:
+        param_preview = json.dumps(param, ensure_ascii=False, default=str)
+    except Exception:
+        param_preview = str(param)
+    if len(param_preview) > 800:
+        param_preview = param_preview[:800] + "…"
+    return tb_full, tb_tail, param_preview
+
+# Table/JSON parsing of large responses is pure CPU; with many children finishing together it
+# starves the loop, so it runs in worker processes. Created lazily: most runs never need it.
+_PARSE_POOL: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+def _parse_pool() -> concurrent.futures.ProcessPoolExecutor:
+    global _PARSE_POOL
+    if _PARSE_POOL is None:
+        # spawn: forking a process that already runs event-loop threads is unsafe
+        _PARSE_POOL = concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(4, os.cpu_count() or 1),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _PARSE_POOL
+
+def _is_picklable_model(model: Type[Any]) -> bool:
+    """Models built with create_model() or inside functions can't cross a process boundary."""
+    module = sys.modules.get(getattr(model, "__module__", ""), None)
+    return "<locals>" not in model.__qualname__ and getattr(module, model.__name__, None) is model
+
+# invoke()s sharing one local session before it's swapped for a fresh one: every call appends
+# its turn to the session and the runner deep-copies all of it per call, although
+# include_contents="none" never reads it back
+SESSION_ROTATE_INVOKES = 32
+
+_NAME_RE = re.compile(r"\W+")
+_NAME_START_RE = re.compile(r"[A-Za-z_]")
 
 class PromptOrchestratorAgent(BaseAgent, PromptOrchestratorSidekick):
     text_agent: LlmAgent
@@ -30,6 +83,11 @@ class PromptOrchestratorAgent(BaseAgent, PromptOrchestratorSidekick):
     session_service: BaseSessionService
     model_config = {"arbitrary_types_allowed": True}
     concurrency : int
+    _local_ctx_lock: asyncio.Lock = PrivateAttr(default_factory=asyncio.Lock)
+    _llm: Optional[ADKLLM] = PrivateAttr(default=None)
+    _chain: Any = PrivateAttr(default=None)
+    _llm_uses: int = PrivateAttr(default=0)
+    _llm_inflight: Dict[int, int] = PrivateAttr(default_factory=dict)  # id(llm) -> calls in flight
 
     def __init__(
         self,
@@ -50,10 +108,8 @@ class PromptOrchestratorAgent(BaseAgent, PromptOrchestratorSidekick):
         tkn = uuid.uuid4().hex[:8]
         text_agent = self._build_llm_agent(f"{base_name}_text_only", model_name)
 
-        # default logger compatible with logger(tag, payload)
         if logger is None:
-            def logger(tag: str, payload: dict):
-                print(f"[{tag}] {payload}")
+            logger = _default_logger
 
         super().__init__(
             model_name=model_name,
@@ -70,9 +126,11 @@ class PromptOrchestratorAgent(BaseAgent, PromptOrchestratorSidekick):
             concurrency=concurrency
         )
 
-    def _sanitize_name(self, name: str) -> str:
-        x = re.sub(r"\W+", "_", name)
-        if not x or not re.match(r"[A-Za-z_]", x[0]):
+    @staticmethod
+    @lru_cache(maxsize=2048)
+    def _sanitize_name(name: str) -> str:
+        x = _NAME_RE.sub("_", name)
+        if not x or not _NAME_START_RE.match(x[0]):
             x = f"a_{x or 'agent'}"
         return x
 
@@ -96,18 +154,61 @@ class PromptOrchestratorAgent(BaseAgent, PromptOrchestratorSidekick):
         )
         return InvocationContext(session_service=self.session_service, session=session, agent=self, invocation_id=uuid.uuid4().hex)
 
+    async def reset_session(self) -> None:
+        """Drop the local session (and the LLM bound to it) so the next invoke() starts fresh."""
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Release the per-agent ADKLLM and its session; call once the agent is done invoking."""
+        llm, self._llm, self._chain = self._llm, None, None
+        if llm is not None and not self._llm_inflight.get(id(llm)):
+            await self._retire_llm(llm)
+
+    async def _retire_llm(self, llm: ADKLLM) -> None:
+        """Deletes the local session an ADKLLM was bound to and closes it."""
+        try:
+            await self.session_service.delete_session(app_name=self.app_name, user_id=self.user_id, session_id=llm.session_id)
+        except Exception:
+            pass
+        try:
+            await llm.aclose()
+        except Exception:
+            pass
+
     async def _build_llm_and_chain_for_ctx(self) -> Tuple[Any, Any]:
-        ctx = await self._fresh_local_ctx()
-        llm = ADKLLM(
-            agent=self.text_agent,
-            session_service=self.session_service,
-            app_name=ctx.app_name,
-            user_id=self.user_id,
-            session_id=ctx.session.id,
-            timeout_s=self.timeout_s,
-        )
-        chain = create_structured_output_chain(llm, logger_fn=self.logger)
-        return llm, chain
+        """
+        One ADKLLM + chain bound to a local session, shared by invoke()s; after SESSION_ROTATE_INVOKES
+        calls the next invoke() moves to a fresh session. Pair every call with _release_llm().
+        """
+        if self._llm is None or self._llm_uses >= SESSION_ROTATE_INVOKES:
+            async with self._local_ctx_lock:
+                if self._llm is None or self._llm_uses >= SESSION_ROTATE_INVOKES:
+                    retired = self._llm
+                    ctx = await self._fresh_local_ctx()
+                    llm = ADKLLM(
+                        agent=self.text_agent,
+                        session_service=self.session_service,
+                        app_name=ctx.app_name,
+                        user_id=self.user_id,
+                        session_id=ctx.session.id,
+                        timeout_s=self.timeout_s,
+                    )
+                    self._chain = create_structured_output_chain(llm, logger_fn=self.logger)
+                    self._llm, self._llm_uses = llm, 0
+                    if retired is not None and not self._llm_inflight.get(id(retired)):
+                        await self._retire_llm(retired)
+        llm = self._llm
+        self._llm_uses += 1
+        self._llm_inflight[id(llm)] = self._llm_inflight.get(id(llm), 0) + 1
+        return llm, self._chain
+
+    async def _release_llm(self, llm: ADKLLM) -> None:
+        """Ends one call on `llm`; the last call on a rotated-out LLM retires it."""
+        left = self._llm_inflight.pop(id(llm), 1) - 1
+        if left > 0:
+            self._llm_inflight[id(llm)] = left
+        elif llm is not self._llm:
+            await self._retire_llm(llm)
 
     async def _invoke_once(self, prompt_text: str, chain: Any) -> str:
         result = await chain.ainvoke({"question": prompt_text})
@@ -123,6 +224,8 @@ class PromptOrchestratorAgent(BaseAgent, PromptOrchestratorSidekick):
         model: Optional[Type[Any]] = None,
         parser: Optional[Callable[[str], Any]] = None,
     ) -> Any:
+        # The LLM is cached on the agent and released by aclose(), not per call.
+        # Do NOT call ADKLLM.close_shared() here; do it at process shutdown.
         llm, chain = await self._build_llm_and_chain_for_ctx()
         try:
             self.logger("PROMPT", prompt)
@@ -132,17 +235,60 @@ class PromptOrchestratorAgent(BaseAgent, PromptOrchestratorSidekick):
             if parser is not None:
                 return parser(final_text)
             if model is not None:
-                # Provided by PromptOrchestratorSidekick
+                instances = await self._parse_in_pool(final_text, model)
+                if instances is not None:
+                    return instances
+                # Provided by PromptOrchestratorSidekick; needs the LLM fallback, so stays in-process
                 return self.obnoxious_text_to_pydantic_list(final_text, model, backup_LLM=llm)
             return final_text
         finally:
-            # Always clean up per-call resources
-            try:
-                if hasattr(llm, "close"):
-                    llm.close()
-            except Exception:
-                pass
-            # Do NOT call ADKLLM.close_shared() here; do it at process shutdown.
+            await self._release_llm(llm)
+
+    async def _parse_in_pool(self, final_text: str, model: Type[Any]) -> Optional[List[Any]]:
+        """Returns None when the text must go through obnoxious_text_to_pydantic_list in-process."""
+        if not _is_picklable_model(model):
+            return None
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(_parse_pool(), parse_offline, final_text, model)
+        except Exception as e:
+            self.logger("PARSE_POOL_FALLBACK", f"name: {self.name}, error: {type(e).__name__}: {e}")
+            return None
+
+    async def _run_bounded(
+        self,
+        items: Sequence[Any],
+        run_one: Callable[[int, Any], Awaitable[Any]],
+        concurrency: Optional[int],
+    ) -> List[Any]:
+        """
+        Runs run_one(idx, item) for every item and returns the results in input order.
+        With concurrency > 0 only that many worker coroutines exist, each pulling the next
+        item off a shared iterator, instead of one pending task per item.
+        Runs inside a TaskGroup: if run_one raises, the remaining work is cancelled and
+        the failure surfaces as an ExceptionGroup.
+        """
+        results: List[Any] = [None] * len(items)
+
+        if not concurrency or concurrency <= 0:
+            async def one(idx: int, item: Any):
+                results[idx] = await run_one(idx, item)
+
+            async with asyncio.TaskGroup() as tg:
+                for i, item in enumerate(items):
+                    tg.create_task(one(i, item))
+            return results
+
+        pending = iter(enumerate(items))
+
+        async def worker():
+            for idx, item in pending:
+                results[idx] = await run_one(idx, item)
+
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(min(concurrency, len(items))):
+                tg.create_task(worker())
+        return results
 
     async def invoke_many(
         self,
@@ -153,42 +299,15 @@ class PromptOrchestratorAgent(BaseAgent, PromptOrchestratorSidekick):
     ) -> List[Any]:
         if concurrency is None:
             concurrency = self.concurrency
-        sem = asyncio.Semaphore(concurrency) if concurrency and concurrency > 0 else None
 
         async def run_one(idx: int, prompt: str):
-            try:
-                if sem:
-                    async with sem:
-                        return idx, await self.invoke(prompt, model, parser)
-                return idx, await self.invoke(prompt, model, parser)
-            except Exception as e:
-                return idx, e
-
-        tasks = [run_one(i, p) for i, p in enumerate(prompts)]
-        results = await asyncio.gather(*tasks, return_exceptions=False)
-        results.sort(key=lambda x: x[0])
-
-        # propagate exceptions in order
-        out: List[Any] = []
-        first_exc: Optional[BaseException] = None
-        for _, r in results:
-            if isinstance(r, Exception) and first_exc is None:
-                first_exc = r
-            out.append(r)
-        if first_exc:
-            # raise the first, but still return gathered order if you prefer
-            raise first_exc
-        return out
-
-    async def _invoke_one_indexed(
-        self,
-        idx: int,
-        prompt: str,
-        model: Optional[Type[Any]],
-        parser: Optional[Callable[[str], Any]],
-    ):
-        ret = await self.invoke(prompt, model, parser)
-        return idx, ret
+            return await self.invoke(prompt, model, parser)
+
+        try:
+            return await self._run_bounded(prompts, run_one, concurrency)
+        except ExceptionGroup as eg:
+            # first failure cancels the rest of the batch; surface it unwrapped
+            raise eg.exceptions[0] from None
 
     async def _spawn_child_agent(
         self,
@@ -229,15 +348,10 @@ class PromptOrchestratorAgent(BaseAgent, PromptOrchestratorSidekick):
                 await runner
             return child.name, ctx
         except Exception as e:
-            tb_full = "".join(traceback.format_exception(type(e), e, e.__traceback__))
-            tail_lines = tb_full.strip().splitlines()[-12:]
-            tb_tail = "\n".join(tail_lines)
-            try:
-                param_preview = json.dumps(param, ensure_ascii=False, default=str)
-            except Exception:
-                param_preview = str(param)
-            if len(param_preview) > 800:
-                param_preview = param_preview[:800] + "…"
+            # Traceback formatting + param dump can be heavy; keep them off the event loop
+            tb_full, tb_tail, param_preview = await asyncio.get_running_loop().run_in_executor(
+                _ERR_POOL, _serialize_child_error, e, param
+            )
 
             try:
                 ctx.session.state.setdefault("errors", {})
@@ -257,6 +371,8 @@ class PromptOrchestratorAgent(BaseAgent, PromptOrchestratorSidekick):
                 f"{child.__class__.__name__} '{child.name}' failed: {type(e).__name__}: {e}\n"
                 f"Traceback (tail):\n{tb_tail}"
             ) from e
+        finally:
+            await child.aclose()
 
     async def invoke_many_agent(
         self,
@@ -266,32 +382,84 @@ class PromptOrchestratorAgent(BaseAgent, PromptOrchestratorSidekick):
     ) -> Tuple[Dict[str, InvocationContext], List[Dict[str, Any]]]:
         if concurrency is None:
             concurrency = self.concurrency
-        sem = asyncio.Semaphore(concurrency) if concurrency and concurrency > 0 else None
 
         failures: List[Dict[str, Any]] = []
 
         async def run_one(idx: int, p: Any) -> Optional[Tuple[str, InvocationContext]]:
-            name = f"{self.name}.child.{idx:06d}"
+            name = self._child_name(idx)
             try:
                 payload = {"params": p, "idx": idx}
-                if sem:
-                    async with sem:
-                        return await self.invoke_one_agent(agent_cls, payload, name=name)
                 return await self.invoke_one_agent(agent_cls, payload, name=name)
             except Exception as e:
-                err = f"{type(e).__name__}: {e}"
-                self.logger("CHILD_ERROR", f"name: {name}, idx: {idx}, error: {err}")
-                failures.append({"name": name, "idx": idx, "error": err, "param": p})
+                failures.append(self._child_failure(name, idx, p, e))
                 return None
 
-        results = await asyncio.gather(*[run_one(i, p) for i, p in enumerate(params)], return_exceptions=False)
-        merged: Dict[str, InvocationContext] = {}
-        for r in results:
-            if r and isinstance(r, tuple):
-                name, child_ctx = r
-                merged[name] = child_ctx
+        results = await self._run_bounded(params, run_one, concurrency)
+        # results are already in params order; failed slots are None
+        merged: Dict[str, InvocationContext] = dict(r for r in results if r is not None)
         return merged, failures
 
+    async def invoke_many_agent_streaming(
+        self,
+        agent_cls: Type["PromptOrchestratorAgent"],
+        params: Sequence[Any],
+        concurrency: Optional[int] = None,
+    ) -> AsyncIterator[Tuple[str, Optional[InvocationContext], Optional[Dict[str, Any]]]]:
+        """
+        Same fan-out as invoke_many_agent, but yields each child as soon as it finishes
+        (completion order) instead of waiting for the slowest one:
+        - (name, child_ctx, None) on success
+        - (name, None, failure) on error, failure shaped like invoke_many_agent's failures
+        """
+        if concurrency is None:
+            concurrency = self.concurrency
+
+        finished: asyncio.Queue = asyncio.Queue()
+
+        async def run_one(idx: int, p: Any) -> None:
+            name = self._child_name(idx)
+            try:
+                payload = {"params": p, "idx": idx}
+                _, child_ctx = await self.invoke_one_agent(agent_cls, payload, name=name)
+                item = (name, child_ctx, None)
+            except BaseException as e:
+                # CancelledError included: every child must report, or the consumer waits forever
+                item = (name, None, self._child_failure(name, idx, p, e))
+                if not isinstance(e, Exception):
+                    raise
+            finally:
+                finished.put_nowait(item)
+
+        producer = asyncio.create_task(self._run_bounded(params, run_one, concurrency))
+        getter: Optional[asyncio.Future] = None
+        try:
+            for _ in range(len(params)):
+                getter = asyncio.ensure_future(finished.get())
+                done, _ = await asyncio.wait({getter, producer}, return_when=asyncio.FIRST_COMPLETED)
+                if getter not in done:
+                    # producer ended first: surface its failure instead of blocking on the queue
+                    getter.cancel()
+                    if finished.empty():
+                        producer.result()
+                        raise RuntimeError("invoke_many_agent_streaming: producer finished with children unaccounted for")
+                    yield finished.get_nowait()
+                    continue
+                yield getter.result()
+            await producer
+        finally:
+            if getter is not None and not getter.done():
+                getter.cancel()
+            if not producer.done():
+                producer.cancel()
+
+    def _child_name(self, idx: int) -> str:
+        return f"{self.name}.child.{idx:06d}"
+
+    def _child_failure(self, name: str, idx: int, param: Any, e: BaseException) -> Dict[str, Any]:
+        err = f"{type(e).__name__}: {e}"
+        self.logger("CHILD_ERROR", f"name: {name}, idx: {idx}, error: {err}")
+        return {"name": name, "idx": idx, "error": err, "param": param}
+
     @override
     async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
         raise NotImplementedError("Subclass must implement the pipeline")
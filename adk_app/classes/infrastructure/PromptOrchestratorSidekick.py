@@ -1,27 +1,332 @@
+import atexit
+import copy
+import hashlib
+import io
 import json
 import re
-from typing import Any, Iterable, List, Optional, Sequence, Type, Union, TypeVar
-import uuid
+import string
+import sys
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type, Union, TypeVar
 from pydantic.v1 import BaseModel, create_model, Field
 from pydantic.v1.json import pydantic_encoder
 import commentjson
-from itertools import zip_longest
+try:
+    import orjson
+except ImportError:  # optional C parser; stdlib json is the fallback
+    orjson = None
+from itertools import count, zip_longest
+from operator import attrgetter
+from collections import OrderedDict
+from weakref import WeakKeyDictionary
 from classes.infrastructure.StructuredOutputChain import create_structured_output_chain
+from classes.infrastructure.ADKLLM import new_event_loop
 
 T = TypeVar("T", bound=BaseModel)
 
+# Patterns used on every line of every parsed LLM response
+# A header's leading hashes, followed by in-line whitespace (a bare "##" line is not a header)
+_HEADER_RE = re.compile(r'^(#+)(?=[^\S\n])', re.MULTILINE)
+_HASHES = tuple('#' * i for i in range(16))
+_PLACEHOLDER_RE = re.compile(r'\{(\w+)\}')
+_SEPARATOR_ROW_RE = re.compile(r'\|[\s:\-|]+\|')
+_BR_JOIN_RE = re.compile(r'\|\s*<br>\s*\|')
+_REPORT_SECTION_RE = re.compile(r"### ::\s*(.+?)\s*\n(.*?)(?=\n### ::|\Z)", re.DOTALL)
+# 20+ digit runs may be ints beyond 64 bits, which orjson.loads silently turns into floats
+_WIDE_DIGITS_RE = re.compile(r'\d{20}')
+_NUMBER_RE = re.compile(r'-?\d+(\.\d+)?')
+# "||" -> "‖" and escaped "\|" -> "¦" in one scan; the lookahead keeps replace()'s
+# precedence, where "||" wins over a "\|" whose pipe starts a "||" pair
+_PIPE_ESCAPE_RE = re.compile(r'\|\||\\\|(?!\|)')
+_PIPE_ESCAPE_MAP = {'||': '‖', '\\|': '¦'}
+# A whole markdown table row line; group 1 is the row without surrounding whitespace
+_TABLE_ROW_LINE_RE = re.compile(r'^[^\S\n]*(\|(?:[^\n]*\|)?)[^\S\n]*$', re.MULTILINE)
+_NON_SPACE_RE = re.compile(r'\S')
+# A pipe inside a cell: at least 2 chars from either end of the row and not padded by two
+# spaces on either side (a real column border usually is)
+_INNER_PIPE_RE = re.compile(r'(?<=..)(?<!  )\|(?!  )(?=..)', re.DOTALL)
+_BACKTICKS_RE = re.compile(r'```[a-zA-Z]*\n?|```\n?')
+_JSON_FENCE_RE = re.compile(r"```(?:json)?\s*([\s\S]*?)\s*```")
+_JSON_OBJECT_RE = re.compile(r"({[\s\S]*})")
+_LSTRIP_NON_ALNUM_RE = re.compile(r'^[^a-zA-Z0-9]+')
+_RSTRIP_NON_ALNUM_RE = re.compile(r'[^a-zA-Z0-9]+$')
+
+# Character sets for the "row made only of pipes/dashes (and whitespace)" tests, as
+# (strip() argument, delete-table for the exact slow path)
+_PIPE_DASH = ("|-" + string.whitespace, str.maketrans("", "", "|-"))
+_PIPE_DASH_COLON = ("|-:" + string.whitespace, str.maketrans("", "", "|-:"))
+_KEYWORD_ROW_TABLE = str.maketrans("", "", " -:|")
+
+def _hashes(level: int) -> str:
+    return _HASHES[level] if 0 <= level < len(_HASHES) else '#' * level
+
+def loads_commented_json(text: str) -> Any:
+    """
+    Parses LLM-emitted JSON. Plain JSON goes through orjson (or stdlib json); only text the
+    strict parser rejects, typically because of comments, pays for the pure-Python commentjson.
+    """
+    try:
+        return orjson.loads(text) if orjson is not None else json.loads(text)
+    except ValueError:
+        return commentjson.loads(text)
+
+def _model_fields(model: Type[BaseModel]) -> Tuple[str, ...]:
+    """model.__annotations__ keys, computed once per model class."""
+    fields = _MODEL_FIELDS.get(model)
+    if fields is None:
+        fields = _MODEL_FIELDS[model] = tuple(model.__annotations__.keys())
+    return fields
+
+def _is_float_literal(s: str) -> bool:
+    """Digits with an optional fractional part ("12", "3.50"); no sign, exponent or spaces."""
+    head, dot, tail = s.partition('.')
+    return head.isdecimal() and (not dot or tail.isdecimal())
+
+# Spellings (lower-cased) that coerce to True for bool fields
+_TRUE_VALUES = frozenset({"true", "yes", "1"})
+
+# Per-type coercion of markdown table cells (already stripped strings)
+def _cell_to_int(s: str):
+    try:
+        return int(s)  # signed, unlike isdigit(); a single scan of the cell
+    except ValueError:
+        return None
+
+def _cell_to_float(s: str):
+    return float(s) if _is_float_literal(s) else None
+
+def _cell_to_bool(s: str) -> bool:
+    return s.lower() in _TRUE_VALUES
+
+def _cell_to_str(s: str) -> str:
+    return s
+
+_CELL_COERCERS = {int: _cell_to_int, float: _cell_to_float, bool: _cell_to_bool, str: _cell_to_str}
+
+# Per-type coercion of JSON values (str fields are flattened by json_to_pydantic_list itself)
+def _json_to_int(value):
+    try:
+        return int(str(value))  # via str so floats and bools still map to None
+    except ValueError:
+        return None
+
+def _json_to_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+def _json_to_bool(value) -> bool:
+    return str(value).lower() in _TRUE_VALUES
+
+_JSON_COERCERS = {int: _json_to_int, float: _json_to_float, bool: _json_to_bool}
+
+# indentation prefixes for nested JSON values, built once for the usual depths
+_INDENTS = tuple("    " * depth for depth in range(16))
+
+# Models made only of bare int/float/bool/str fields with no validators, constraints or
+# aliases: once the coercers above have run, validation would hand the values back unchanged
+_PLAIN_MODELS: "WeakKeyDictionary[type, bool]" = WeakKeyDictionary()
+_STR_CONFIG_FLAGS = ("anystr_strip_whitespace", "anystr_lower", "anystr_upper", "min_anystr_length", "max_anystr_length")
+
+def _is_plain_model(model: Type[BaseModel]) -> bool:
+    plain = _PLAIN_MODELS.get(model)
+    if plain is None:
+        annotations = model.__annotations__
+        config = model.__config__
+        plain = _PLAIN_MODELS[model] = (
+            model.__init__ is BaseModel.__init__
+            and not model.__validators__
+            and not model.__pre_root_validators__
+            and not model.__post_root_validators__
+            and not any(getattr(config, flag, None) for flag in _STR_CONFIG_FLAGS)
+            and all(
+                annotations.get(name) in _CELL_COERCERS
+                and field.alias == name
+                and not field.field_info.get_constraints()
+                for name, field in model.__fields__.items()
+            )
+        )
+    return plain
+
+
+# model -> {excluded field names: (kept fields, header + separator rows, row getter)}
+_TABLE_LAYOUTS: "WeakKeyDictionary[type, Dict[frozenset, Tuple[List[str], str, Optional[attrgetter]]]]" = WeakKeyDictionary()
+
+def _table_layout(model_class: Type[BaseModel], excluded_fields: frozenset) -> Tuple[List[str], str, Optional[attrgetter]]:
+    layouts = _TABLE_LAYOUTS.get(model_class)
+    if layouts is None:
+        layouts = _TABLE_LAYOUTS[model_class] = {}
+    layout = layouts.get(excluded_fields)
+    if layout is None:
+        # Extract field names and descriptions; exclusions are resolved once, not per cell
+        model_fields = model_class.__fields__
+        included = [field for field in model_fields if field not in excluded_fields]
+        headers = [model_fields[field].field_info.description or field for field in included]
+        header_row = "| " + " | ".join(headers) + " |"
+        separator = "| " + " | ".join(["-" * len(header) for header in headers]) + " |"
+        # attrgetter fetches a whole row in one call
+        fetch = attrgetter(*included) if len(included) > 1 else None
+        layout = layouts[excluded_fields] = (included, header_row + "\n" + separator, fetch)
+    return layout
+
+def _build_instance(model: Type[BaseModel], values: Dict[str, Any]) -> BaseModel:
+    """model(**values), skipping validation when it could only return the values unchanged."""
+    if len(values) == len(model.__fields__) and None not in values.values() and _is_plain_model(model):
+        return model.construct(**values)
+    return model(**values)
+
+def _protect_pipes(text: str) -> str:
+    return _PIPE_ESCAPE_RE.sub(lambda m: _PIPE_ESCAPE_MAP[m.group(0)], text)
+
+def _is_separator(line: str, charset=_PIPE_DASH) -> bool:
+    strip_chars, table = charset
+    # strip() stops at the first foreign char, so data rows are rejected after a few chars
+    rest = line.strip(strip_chars)
+    # only non-ASCII whitespace can stop strip() on a real separator: settle it exactly
+    return not rest or (rest[0].isspace() and not rest.translate(table).strip())
+
+def _scan_markdown(data: str) -> Tuple[int, int, int]:
+    """Single sweep over the lines: (table rows, ``` fences, '### ::' report headers)."""
+    table_lines = backtick_lines = report_lines = 0
+    for line in data.splitlines():
+        s = line.strip()
+        if s.startswith("|") and s.endswith("|"):
+            table_lines += 1
+        if s.startswith("```"):
+            backtick_lines += 1
+        elif s.startswith("### ::"):
+            report_lines += 1
+    return table_lines, backtick_lines, report_lines
+
+@lru_cache(maxsize=64)
+def _lstrip_re(chars: str) -> re.Pattern:
+    return re.compile(f'^[{re.escape(chars)}]+') if chars else _LSTRIP_NON_ALNUM_RE
+
+@lru_cache(maxsize=64)
+def _rstrip_re(chars: str) -> re.Pattern:
+    return re.compile(f'[{re.escape(chars)}]+$') if chars else _RSTRIP_NON_ALNUM_RE
+
+@lru_cache(maxsize=64)
+def _ci_literal_re(literal: str) -> re.Pattern:
+    return re.compile(re.escape(literal), re.IGNORECASE)
+
 import asyncio, threading
 
+# color_print escape prefixes
+_ANSI_COLORS = {
+    name: f"\033[{code}m" for name, code in {
+        'black': '30', 'red': '31', 'green': '32', 'yellow': '33', 'blue': '34', 'magenta': '35',
+        'cyan': '36', 'white': '37', 'bright_black': '90', 'bright_red': '91', 'bright_green': '92',
+        'bright_yellow': '93', 'bright_blue': '94', 'bright_magenta': '95', 'bright_cyan': '96', 'bright_white': '97'
+    }.items()
+}
+# color_print only flushes at line ends; don't lose a trailing partial line
+atexit.register(lambda: sys.stdout.flush())
+
+# Suffix for dynamically created model names: only needs to be unique within the process
+_model_ids = count(1)
+
+# Field-name tuples per model class; weak so create_model() classes can still be collected
+_MODEL_FIELDS: "WeakKeyDictionary[type, Tuple[str, ...]]" = WeakKeyDictionary()
+
+# Max emergency-fallback LLM calls in flight per obnoxious_text_to_pydantic_list call
+_FALLBACK_CONCURRENCY = 4
+
+# (id(model), id(llm)) -> (model, llm, chain); bounded, since it keeps both alive
+_FALLBACK_CHAINS: "OrderedDict[Tuple[int, int], Tuple[Any, Any, Any]]" = OrderedDict()
+_FALLBACK_CHAINS_MAX = 32
+
+def _fallback_chain(model: Type[BaseModel], llm):
+    """Wrapper list model + structured chain for the emergency fallback, built once per (model, llm)."""
+    key = (id(model), id(llm))
+    entry = _FALLBACK_CHAINS.get(key)
+    if entry is not None and entry[0] is model and entry[1] is llm:
+        _FALLBACK_CHAINS.move_to_end(key)
+        return entry[2]
+    list_model = create_model(f"{model.__name__}List", items=(list[model], ...))
+    chain = create_structured_output_chain(llm, list_model)
+    _FALLBACK_CHAINS[key] = (model, llm, chain)
+    if len(_FALLBACK_CHAINS) > _FALLBACK_CHAINS_MAX:
+        _FALLBACK_CHAINS.popitem(last=False)
+    return chain
+
+# Field signature -> dynamically created model: shape-identical requests share one class
+# instead of re-running create_model's field/validator setup
+_DYNAMIC_MODELS: "OrderedDict[Tuple[Any, ...], Type[BaseModel]]" = OrderedDict()
+_DYNAMIC_MODELS_MAX = 256
+
+def _fields_signature(fields) -> Tuple[Any, ...]:
+    return tuple((name, typ, repr(default)) for name, typ, default in fields)
+
+def _cached_model(key, build) -> Type[BaseModel]:
+    try:
+        model = _DYNAMIC_MODELS.get(key)
+    except TypeError:  # unhashable field type: nothing to share
+        return build()
+    if model is None:
+        model = _DYNAMIC_MODELS[key] = build()
+        if len(_DYNAMIC_MODELS) > _DYNAMIC_MODELS_MAX:
+            _DYNAMIC_MODELS.popitem(last=False)
+    else:
+        _DYNAMIC_MODELS.move_to_end(key)
+    return model
+
+class _InstanceListCache:
+    """
+    Bounded, thread-safe LRU of parsed model-instance lists. Entries remember their model and
+    are only served back for that same class; instances are mutable, so copies go in and out.
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[Any, List[BaseModel]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, model: Type[BaseModel]) -> Optional[List[BaseModel]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] is not model:
+                return None
+            self._entries.move_to_end(key)
+            cached = entry[1]
+        return [instance.copy(deep=True) for instance in cached]
+
+    def put(self, key, model: Type[BaseModel], instances: List[BaseModel]) -> None:
+        snapshot = [instance.copy(deep=True) for instance in instances]
+        with self._lock:
+            self._entries[key] = (model, snapshot)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+def _digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+# (digest(data), id(model), column_id, output_format) -> instances. Retries and re-asks often
+# hand back the same response; hits skip the parse and any LLM fallback.
+_PARSE_CACHE = _InstanceListCache(256)
+# (digest(fallback prompt), id(model)) -> items: identical recordsets skip the LLM round-trip
+_FALLBACK_CACHE = _InstanceListCache(256)
+
 _bg_loop = None
 _bg_thread = None
+_bg_lock = threading.Lock()
 
 def _ensure_bg_loop():
     global _bg_loop, _bg_thread
-    if _bg_loop is None:
-        _bg_loop = asyncio.new_event_loop()
-        _bg_thread = threading.Thread(target=_bg_loop.run_forever, daemon=True)
-        _bg_thread.start()
-    return _bg_loop
+    loop = _bg_loop
+    if loop is not None:
+        return loop
+    # double-checked: concurrent first callers must not each start a loop thread
+    with _bg_lock:
+        if _bg_loop is None:
+            loop = new_event_loop()
+            # fallback coroutines that finish without suspending skip a scheduler round-trip
+            loop.set_task_factory(asyncio.eager_task_factory)
+            _bg_thread = threading.Thread(target=loop.run_forever, daemon=True)
+            _bg_thread.start()
+            _bg_loop = loop
+        return _bg_loop
 
 def run_coro_sync(coroutine):
     try:
@@ -32,6 +337,10 @@ def run_coro_sync(coroutine):
         bg = _ensure_bg_loop()
         return asyncio.run_coroutine_threadsafe(coroutine, bg).result()
 
+def parse_offline(data: str, model: Type[BaseModel], column_id=0):
+    """Process-pool entry point for PromptOrchestratorSidekick.parse_text_to_pydantic_list_offline."""
+    return PromptOrchestratorSidekick().parse_text_to_pydantic_list_offline(data, model, column_id)
+
 
 class PromptOrchestratorSidekick:
     def obnoxious_text_to_pydantic_list(self, data:str ,  model: Type[BaseModel], column_id= 0, output_format = None, backup_LLM = None):
@@ -75,32 +384,6 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
 
 {output_format}
 """
-        def parse_report_sections(text: str, model: Type[BaseModel]) -> List[BaseModel]:
-            """
-            Parses sections from text using '### ::Label' headers and returns a list of instances.
-
-            Args:
-                text: The input text to parse.
-                model: A Pydantic model class with exactly two fields (e.g., component and content).
-
-            Returns:
-                A list of model instances with extracted values.
-            """
-            pattern = r"### ::\s*(.+?)\s*\n(.*?)(?=\n### ::|\Z)"
-            matches = re.findall(pattern, text, re.DOTALL)
-
-            # Dynamically grab the field names (we assume there's exactly 2)
-            field_names = list(model.__annotations__.keys())
-            if len(field_names) < 2:
-                raise ValueError("Model must have more than 1 field")
-            return [
-                model(**{
-                    field_names[0]: label.strip(),
-                    field_names[1]: content.strip()
-                })
-                for label, content in matches
-            ]
-
         def create_fallback_recordset(data, row_count):
             def extract_tables(md_text):
                 tables = []
@@ -108,40 +391,44 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
                 table_found = False
                 pending_header = None
                 last_was_separator = False
-                md_text = md_text.replace("||","‖").replace("\\|", "¦")
+                md_text = _protect_pipes(md_text)
                 md_text = md_text[md_text.find('|'):md_text.rfind('|') + 1]
-                lines = md_text.split("\n")
-
-                for i, line in enumerate(lines):
-                    stripped_line = line.strip()
-                    if stripped_line.startswith("|") and stripped_line.endswith("|"):
-                        if len(stripped_line.replace("|", "").replace("-", "").strip()) == 0:
-                            table_found = True
-                            if pending_header:
-                                current_table = [pending_header, stripped_line]
-                                pending_header = None
-                                last_was_separator = True
-                            else:
-                                last_was_separator = True
-                            continue
-
-                        if last_was_separator:
-                            current_table.append(stripped_line)
-                            last_was_separator = False
-                        elif current_table:
-                            current_table.append(stripped_line)
-                        else:
-                            pending_header = stripped_line
-                    elif len(stripped_line) == 0:
+
+                def close_block():
+                    # a non-table, non-empty line ends whatever table is being collected
+                    nonlocal current_table, pending_header, last_was_separator
+                    if current_table:
+                        tables.append(current_table)
+                        current_table = []
+                    elif pending_header and table_found:
+                        tables.append([pending_header])
+                    pending_header = None
+                    last_was_separator = False
+
+                # The regex walks the rows; prose between two rows is spotted in the gap
+                prev_end = 0
+                for row in _TABLE_ROW_LINE_RE.finditer(md_text):
+                    if _NON_SPACE_RE.search(md_text, prev_end, row.start()):
+                        close_block()
+                    prev_end = row.end()
+                    stripped_line = row.group(1)
+                    if _is_separator(stripped_line):
+                        table_found = True
+                        if pending_header:
+                            current_table = [pending_header, stripped_line]
+                            pending_header = None
+                        last_was_separator = True
                         continue
-                    else:
-                        if current_table:
-                            tables.append(current_table)
-                            current_table = []
-                        elif pending_header and table_found:
-                            tables.append([pending_header])
-                        pending_header = None
+
+                    if last_was_separator:
+                        current_table.append(stripped_line)
                         last_was_separator = False
+                    elif current_table:
+                        current_table.append(stripped_line)
+                    else:
+                        pending_header = stripped_line
+                if _NON_SPACE_RE.search(md_text, prev_end):
+                    close_block()
 
                 # Handle any leftovers
                 if current_table:
@@ -167,40 +454,25 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
                         first_table = False
                         continue
 
-                    i = 0
-                    header_check = True
-
-                    while i < len(table):
-                        line = table[i].strip()
-                        is_separator = len(line.replace("|", "").replace("-", "").strip()) == 0
-
-                        if header_check:
-                            if is_separator:
-                                # Line 0 is just a separator (invalid?), skip it
-                                i += 1
-                                header_check = False
-                            elif i + 1 < len(table):
-                                next_line = table[i + 1].strip()
-                                is_next_separator = len(next_line.replace("|", "").replace("-", "").strip()) == 0
-
-                                if is_next_separator:
-                                    # This is a header + separator pair → discard both
-                                    i += 2
-                                else:
-                                    # Not a header pair, treat both as rows
-                                    merged_lines.append(line)
-                                    merged_lines.append(next_line)
-                                    i += 2
-                                header_check = False
-                            else:
-                                # Only one line left, just keep it
-                                merged_lines.append(line)
-                                i += 1
-                                header_check = False
-                        else:
-                            if not is_separator:
-                                merged_lines.append(line)
-                            i += 1
+                    if not table:
+                        continue
+                    # one separator test per line, reused by the header check and the row walk
+                    sep = [_is_separator(line) for line in table]
+                    if sep[0]:
+                        # Line 0 is just a separator (invalid?), skip it
+                        i = 1
+                    elif len(table) > 1:
+                        if not sep[1]:
+                            # Not a header pair, treat both as rows
+                            merged_lines.append(table[0].strip())
+                            merged_lines.append(table[1].strip())
+                        # else: a header + separator pair → discard both
+                        i = 2
+                    else:
+                        # Only one line left, just keep it
+                        merged_lines.append(table[0].strip())
+                        i = 1
+                    merged_lines.extend(table[j].strip() for j in range(i, len(table)) if not sep[j])
 
                 return merged_lines
 
@@ -215,7 +487,7 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
                 # Try to detect a header
                 if len(merged_lines) >= 2:
                     maybe_separator = merged_lines[1]
-                    is_separator = len(maybe_separator.replace("|", "").replace("-", "").strip()) == 0
+                    is_separator = _is_separator(maybe_separator)
                     if is_separator:
                         header = merged_lines[:2]
                         data_start = 2
@@ -234,11 +506,10 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
         def extract_defective_lines_header_rows(md_text):
             pending_header = None
             md_text = md_text[md_text.find('|'):md_text.rfind('|') + 1]
-            lines = md_text.split("\n")
-            for line in lines:
+            for line in io.StringIO(md_text):
                 stripped_line = line.strip()
                 if stripped_line.startswith("|") and stripped_line.endswith("|"):
-                    if len(stripped_line.replace("|", "").replace("-", "").strip()) == 0:
+                    if _is_separator(stripped_line):
                         if pending_header:
                             return [pending_header, stripped_line]
                     else:
@@ -251,61 +522,145 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
 
         def execute_emergency_fallback_call(model, output_format, backup_LLM, main_prompt, recordsets):
             async def _async_impl():
-                list_model = create_model(f"{model.__name__}List_{uuid.uuid4().hex}", items=(list[model], ...))
-                backup_chain = create_structured_output_chain(backup_LLM, list_model)
+                backup_chain = _fallback_chain(model, backup_LLM)
                 instances = []
                 self.color_print(f"executing emergency fallback call", "yellow")
-                try:
-                    for rs in recordsets:
-                        prompt = self.unsafe_string_format(
-                            main_prompt,
-                            data=rs,
-                            output_format = output_format if output_format else ""
-                        )
-                        instances += getattr(await backup_chain.ainvoke({"question": prompt, "instance": None}), "items")
-                except Exception as e:
-                    self.color_print(f"execute_emergency_fallback_call: Error in create_structured_output_chain: {e}", "red")
-                return instances
+                # recordsets are independent requests: overlap them, within the provider's patience
+                sem = asyncio.Semaphore(_FALLBACK_CONCURRENCY)
+
+                async def _one(rs):
+                    prompt = self.unsafe_string_format(
+                        main_prompt,
+                        data=rs,
+                        output_format = output_format if output_format else ""
+                    )
+                    key = (_digest(prompt), id(model))
+                    items = _FALLBACK_CACHE.get(key, model)
+                    if items is not None:
+                        return items
+                    async with sem:
+                        items = getattr(await backup_chain.ainvoke({"question": prompt, "instance": None}), "items")
+                    if items:
+                        _FALLBACK_CACHE.put(key, model, items)
+                    return items
+
+                results = await asyncio.gather(*(_one(rs) for rs in recordsets), return_exceptions=True)
+                extend = instances.extend
+                failed = False
+                for r in results:
+                    if isinstance(r, Exception):
+                        failed = True
+                        self.color_print(f"execute_emergency_fallback_call: Error in create_structured_output_chain: {r}", "red")
+                    elif r:
+                        extend(r)
+                return instances, failed
             return run_coro_sync(_async_impl())
 
+        cache_key = (_digest(data), id(model), column_id, output_format) if isinstance(data, str) else None
+        if cache_key is not None:
+            cached = _PARSE_CACHE.get(cache_key, model)
+            if cached is not None:
+                return cached
+
         if backup_LLM is None:
             backup_LLM = self.llm
+        instances, defective_lines, isDataInTableFormat = self._parse_without_llm(data, model, column_id)
+
+        # Unparsed data and defective rows go to the LLM as one batch, so all the calls overlap
+        recordsets = []
+        fallback_failed = False
+        if instances is None:
+            instances, recordsets = [], [data] if not isDataInTableFormat else create_fallback_recordset(data, 20)
+            if not recordsets:
+                recordsets = [data]
+        if defective_lines:
+            defective_lines = extract_defective_lines_header_rows(data) + defective_lines
+            recordsets.append("\n".join(defective_lines))
+        if recordsets:
+            recovered, fallback_failed = execute_emergency_fallback_call(model, output_format, backup_LLM, main_prompt, recordsets)
+            instances += recovered
+        instances = self._ex_post_cleanup(instances)
+        # an empty result, or one missing a failed recordset's rows, stays retryable
+        if cache_key is not None and instances and not fallback_failed:
+            _PARSE_CACHE.put(cache_key, model, instances)
+        return instances
+
+    def _parse_without_llm(self, data: str, model: Type[BaseModel], column_id=0):
+        """
+        LLM-free first pass of obnoxious_text_to_pydantic_list.
+        Returns (instances or None, defective_lines, isDataInTableFormat).
+        """
         instances = None
         isDataInTableFormat= False
         defective_lines = None
         try:
-            table_lines = [line for line in data.splitlines() if line.strip().startswith("|") and line.strip().endswith("|")]
-            backtick_lines = [i for i, line in enumerate(data.splitlines()) if line.strip().startswith("```")]
-            report_lines = [i for i, line in enumerate(data.splitlines()) if line.strip().startswith("### ::")]
-            if len(table_lines) == 0 and len(report_lines) == 0  and len(backtick_lines) == 2:
+            table_lines, backtick_lines, report_lines = _scan_markdown(data)
+            if table_lines == 0 and report_lines == 0  and backtick_lines == 2:
                 instances = self.json_to_pydantic_list(data, model)
-            elif len(report_lines) > 0:
-                instances = parse_report_sections(data, model)
+            elif report_lines > 0:
+                instances = self._parse_report_sections(data, model)
             else:
                 isDataInTableFormat = True
                 instances, defective_lines = self.md_table_to_pydantic_list(data, model, column_id)
         except Exception as e:
             self.color_print(f"Error in obnoxious_text_to_pydantic_list: {e}", "red")
             instances = None
+        return instances, defective_lines, isDataInTableFormat
 
-        if instances is None:
-            instances, recordsets = [], [data] if not isDataInTableFormat else create_fallback_recordset(data, 20)
-            if not recordsets:
-                recordsets = [data]
-            instances = execute_emergency_fallback_call(model, output_format, backup_LLM, main_prompt, recordsets)
-        if defective_lines:
-            defective_lines = extract_defective_lines_header_rows(data) + defective_lines
-            defective_instances = execute_emergency_fallback_call(model, output_format, backup_LLM, main_prompt, ["\n".join(defective_lines)])
-            if defective_instances:
-                instances += defective_instances
-        # Attempted ex-post cleanup
+    def _ex_post_cleanup(self, instances):
+        # Attempted ex-post cleanup; writes go straight to __dict__ (no __setattr__ dispatch per field)
         for instance in instances:
-            for field_name in instance.__annotations__:
-                value = getattr(instance, field_name)
-                if isinstance(value, str):
-                    setattr(instance, field_name, value.replace("||", "or").replace("|", "or").replace("\n", "<br>"))
+            values = instance.__dict__
+            for field_name in _model_fields(type(instance)):
+                value = values.get(field_name)
+                if not isinstance(value, str):
+                    continue
+                # most cells are clean: the memchr-backed `in` checks skip them without allocating
+                has_pipe = "|" in value
+                has_newline = "\n" in value
+                if not (has_pipe or has_newline):
+                    continue
+                if has_pipe:
+                    value = value.replace("||", "or").replace("|", "or")
+                if has_newline:
+                    value = value.replace("\n", "<br>")
+                values[field_name] = value
         return instances
 
+    def parse_text_to_pydantic_list_offline(self, data: str, model: Type[BaseModel], column_id=0) -> Optional[List[BaseModel]]:
+        """
+        obnoxious_text_to_pydantic_list for the cases that need no LLM.
+        Returns None when the text would need the emergency LLM fallback.
+        """
+        instances, defective_lines, _ = self._parse_without_llm(data, model, column_id)
+        if instances is None or defective_lines:
+            return None
+        return self._ex_post_cleanup(instances)
+
+    def _parse_report_sections(self, text: str, model: Type[BaseModel]) -> List[BaseModel]:
+        """
+        Parses sections from text using '### ::Label' headers and returns a list of instances.
+
+        Args:
+            text: The input text to parse.
+            model: A Pydantic model class with exactly two fields (e.g., component and content).
+
+        Returns:
+            A list of model instances with extracted values.
+        """
+        # Dynamically grab the field names (we assume there's exactly 2)
+        field_names = _model_fields(model)
+        if len(field_names) < 2:
+            raise ValueError("Model must have more than 1 field")
+        return [
+            model(**{
+                field_names[0]: m.group(1).strip(),
+                field_names[1]: m.group(2).strip()
+            })
+            for m in _REPORT_SECTION_RE.finditer(text)
+        ]
+
+
     def unsafe_string_format(self, dest_string, print_unused_keys_report=True, **kwargs):
         """
         Formats a destination string by replacing placeholders with corresponding values from kwargs.
@@ -324,8 +679,7 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
                 missing_keys.append(key)
                 return match.group(0)  # Leave the placeholder unchanged
 
-        pattern = re.compile(r'\{(\w+)\}')
-        result = pattern.sub(replacer, dest_string)
+        result = _PLACEHOLDER_RE.sub(replacer, dest_string)
         if missing_keys and print_unused_keys_report:
             print(f"\033[93m\033[3mMissing keys within string-to-format in unsafe_string_format: {', '.join(missing_keys)}\033[0m", flush=True)
             # print(f"\033[93m\033[3mOriginal string: {dest_string}\033[0m", flush=True)
@@ -336,45 +690,25 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
         Demotes all markdown headers in a document by a certain number of levels.
         The first header will be demoted to at least the starting_level, while preserving the internal hierarchy.
         """
-        lines = markdown.split('\n')
-
-        for i, line in enumerate(lines):
-            # Check if the line is a header
-            header_match = re.match(r'^(#+)\s', line)
-
-            if header_match:
-                header_level = len(header_match.group(1))
-                demoted_level = header_level + (starting_level - 1)
-                lines[i] = re.sub(r'^#+', '#' * demoted_level, line)
-
-        return '\n'.join(lines)
+        offset = starting_level - 1
+        return _HEADER_RE.sub(lambda m: _hashes(len(m.group(1)) + offset), markdown)
 
     def normalize_headers(self, markdown):
         """
         Normalizes markdown headers by adjusting the levels such that the first header is demoted to level 1 (`#`).
         Subsequent headers are adjusted relative to the first header to maintain the hierarchy.
         """
-        lines = markdown.split('\n')
-        current_level = None
         level_adjustment = None
 
-        for i, line in enumerate(lines):
-            header_match = re.match(r'^(#+)\s', line)
-
-            if header_match:
-                header_level = len(header_match.group(1))
-                if current_level is None:
-                    current_level = header_level
-                    level_adjustment = current_level - 1  # This ensures the first header is demoted to level 1
-
-                # Calculate the new level for the header, adjusting by the starting level
-                new_level = header_level - level_adjustment
-                if new_level < 1:
-                    new_level = 1  # Ensure no header goes below level 1
+        def renumber(match):
+            nonlocal level_adjustment
+            header_level = len(match.group(1))
+            if level_adjustment is None:
+                level_adjustment = header_level - 1  # This ensures the first header is demoted to level 1
+            # Never go below level 1
+            return _hashes(max(1, header_level - level_adjustment))
 
-                lines[i] = re.sub(r'^#+', '#' * new_level, line)
-
-        return '\n'.join(lines)
+        return _HEADER_RE.sub(renumber, markdown)
 
     def normalize_demote_headers(self, markdown, starting_level=3):
         """
@@ -388,77 +722,60 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
     def create_tag(self, tag_name, content):
         return f"<{tag_name}>\n{content}\n</{tag_name}>"
 
-    def remove_tag(self, tag_name, text, with_removed=False):
+    def _split_tag(self, tag_name, text):
+        """Returns (before, content, after) around the first <tag_name>...</tag_name>, or None."""
         start_tag = f"<{tag_name}>"
         end_tag = f"</{tag_name}>"
-        removed_text = ""
-
-        start_index = text.find(start_tag)
-        end_index = text.find(end_tag)
+        head, sep, rest = text.partition(start_tag)
+        if not sep:
+            return None
+        content, sep, tail = rest.partition(end_tag)
+        if not sep:
+            return None
+        return head, content, tail
 
-        if start_index != -1 and end_index != -1:
-            content_start_index = start_index + len(start_tag)
-            content_end_index = end_index
-            removed_text = text[content_start_index:content_end_index]
-            text = text[:start_index] + text[end_index + len(end_tag):]
+    def remove_tag(self, tag_name, text, with_removed=False):
+        removed_text = ""
+        parts = self._split_tag(tag_name, text)
+        if parts is not None:
+            head, removed_text, tail = parts
+            text = head + tail
 
         if with_removed:
             return text, removed_text
         return text
 
     def replace_tag(self, tag_name, text, new_content):
-        start_tag = f"<{tag_name}>"
-        end_tag = f"</{tag_name}>"
-
-        start_index = text.find(start_tag)
-        end_index = text.find(end_tag)
-
-        if start_index != -1 and end_index != -1:
-            # Calculate where the content starts and ends
-            content_start_index = start_index + len(start_tag)
-            content_end_index = end_index
-
+        parts = self._split_tag(tag_name, text)
+        if parts is not None:
             # Replace the content between the tags
-            text = text[:content_start_index] + new_content + text[content_end_index:]
+            head, _, tail = parts
+            text = f"{head}<{tag_name}>{new_content}</{tag_name}>{tail}"
         else:
             # If the tag is not found, append the new tag at the bottom of the text
-            text += f"\n{start_tag}{new_content}{end_tag}"
+            text += f"\n<{tag_name}>{new_content}</{tag_name}>"
 
         return text
 
     def retrieve_tag(self, tag_name, text):
-        start_tag = f"<{tag_name}>"
-        end_tag = f"</{tag_name}>"
-
-        start_index = text.find(start_tag)
-        if start_index != -1:
-            end_index = text.find(end_tag, start_index)
-            if end_index != -1:
-                content_start_index = start_index + len(start_tag)
-                content_end_index = end_index
-                return text[content_start_index:content_end_index]
+        parts = self._split_tag(tag_name, text)
         # If the tag is not found, return ""
-        return ""
+        return parts[1] if parts is not None else ""
 
     def clean_triple_backticks(self, code) -> str:
-        pattern = r'```[a-zA-Z]*\n?|```\n?'
-        return re.sub(pattern, '', code)
+        return _BACKTICKS_RE.sub('', code)
 
     def color_print(self, text, color=None, end_value=None):
-        COLOR_CODES = {
-            'black': '30', 'red': '31', 'green': '32', 'yellow': '33', 'blue': '34', 'magenta': '35',
-            'cyan': '36', 'white': '37', 'bright_black': '90', 'bright_red': '91', 'bright_green': '92',
-            'bright_yellow': '93', 'bright_blue': '94', 'bright_magenta': '95', 'bright_cyan': '96', 'bright_white': '97'
-        }
-        if color and color.lower() in COLOR_CODES:
-            color_code = COLOR_CODES[color.lower()]
-            start = f"\033[{color_code}m"
-            end = "\033[0m"
-            text = f"{start}{text}{end}"
-        if end_value == None:
-            print(text, flush=True)
+        prefix = _ANSI_COLORS.get(color.lower()) if color else None
+        end = "\n" if end_value is None else end_value
+        stream = sys.stdout
+        if prefix is None:
+            stream.write(f"{text}{end}")
         else:
-            print(text, end=end_value, flush=True)
+            stream.write(f"{prefix}{text}\033[0m{end}")
+        # flush on line boundaries only: partial-line progress output stays buffered
+        if "\n" in end:
+            stream.flush()
         return False
 
     def reprotect_brackets(self, inpt:str):
@@ -469,13 +786,11 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
 
     def deep_lstrip(self, text: str, chars: str ="") -> str:
         """Remove specified characters or non-alphanumerics from the start."""
-        pattern = f'^[{re.escape(chars)}]+' if chars else r'^[^a-zA-Z0-9]+'
-        return re.sub(pattern, '', text)
+        return _lstrip_re(chars).sub('', text)
 
     def deep_rstrip(self, text: str = '', chars: str ="") -> str:
         """Remove specified characters or non-alphanumerics from the end."""
-        pattern = f'[{re.escape(chars)}]+$' if chars else r'[^a-zA-Z0-9]+$'
-        return re.sub(pattern, '', text)
+        return _rstrip_re(chars).sub('', text)
 
     def deep_strip(self, text: str, chars: str ="") -> str:
         """Remove specified characters or non-alphanumerics from both ends."""
@@ -514,7 +829,7 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
         except Exception:
             pass
         try:
-            numeric_part = re.search(r'-?\d+(\.\d+)?', value)
+            numeric_part = _NUMBER_RE.search(value)
             if numeric_part:
                 return int(round(float(numeric_part.group())))
         except Exception:
@@ -526,6 +841,14 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
         Sums two tuples of integers element-wise.
         If they have different lengths, the missing values are treated as 0.
         """
+        n = len(t1)
+        if n == len(t2):
+            # common coordinate shapes: no iterator / generator machinery
+            if n == 2:
+                return (t1[0] + t2[0], t1[1] + t2[1])
+            if n == 4:
+                return (t1[0] + t2[0], t1[1] + t2[1], t1[2] + t2[2], t1[3] + t2[3])
+            return tuple(a + b for a, b in zip(t1, t2))
         return tuple(a + b for a, b in zip_longest(t1, t2, fillvalue=0))
 
     def custom_phrasal_string_list_join(self, string_list, sep: str, last_sep: str = None,
@@ -614,35 +937,23 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
                 "end of report"
             }
             def smart_pipe_replace(line):
-                chars = list(line)
-                for i in range(2, len(chars) - 2):
-                    if chars[i] != '|':
-                        continue
-
-                    left = chars[i - 2:i]
-                    right = chars[i + 1:i + 3]
-
-                    # Count spaces: max 1 space on each side allowed
-                    if (chars[i-2] != " " or chars[i-1] != " ") and (chars[i+2] != " " or chars[i+1] != " "):
-                        chars[i] = '¦'
-
-                return ''.join(chars)
+                return _INNER_PIPE_RE.sub('¦', line)
 
             def _is_keyword_row(line: str) -> bool:
                 s = line.strip()
                 if not (s.startswith('|') and s.endswith('|')):
                     return False
-                if re.fullmatch(r'\|[\s:\-|]+\|', s):
+                if _SEPARATOR_ROW_RE.fullmatch(s):
                     return False
                 inner = s[1:-1]  # keep raw inner content
                 lowered = inner.lower()
                 for kw in KEYWORD_ROWS:
                     if kw in lowered:
-                        inner = re.sub(re.escape(kw), "", inner, flags=re.IGNORECASE)
-                return inner.replace(" ", "").replace("-", "").replace(":", "").replace("|","").strip() == ""
+                        inner = _ci_literal_re(kw).sub("", inner)
+                return not inner.translate(_KEYWORD_ROW_TABLE).strip()
 
             # Step 1: Trim everything before first and after last '|'
-            text = text.replace("||","‖").replace("\\|", "¦")
+            text = _protect_pipes(text)
             first_pipe = text.find('|')
             last_pipe = text.rfind('|')
             if first_pipe == -1 or last_pipe == -1 or first_pipe >= last_pipe:
@@ -655,7 +966,7 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
                 if line.strip():
                     clean_lines.append(line)
             for line in clean_lines:
-                if re.fullmatch(r'\|[\s:\-|]+\|', line.strip()):
+                if _SEPARATOR_ROW_RE.fullmatch(line.strip()):
                     num_cols = line.count('|') - 1
                     break
             if num_cols == 0:
@@ -671,7 +982,7 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
             br_text = trimmed.replace('\n', '<br>')
 
             # Step 4: Replace |<br>| patterns with real newlines, tolerant to space
-            br_text = re.sub(r'\|\s*<br>\s*\|', '|\n|', br_text)
+            br_text = _BR_JOIN_RE.sub('|\n|', br_text)
 
             # Step 5: Validate row by row
             fixed_text = []
@@ -679,11 +990,10 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
                 if _is_keyword_row(line):
                     continue
                 if line.startswith('|') and line.endswith('|'):
-                    cells = line.split('|')[1:-1]
-                    if len(cells) != num_cols:
+                    # cells between the outer pipes == inner pipe count + 1
+                    if line.count('|') - 1 != num_cols:
                         fixed_line = smart_pipe_replace(line)
-                        cells = fixed_line.split('|')[1:-1]
-                        if len(cells) != num_cols:
+                        if fixed_line.count('|') - 1 != num_cols:
                             defective_lines.append(line)
                         else:
                             fixed_text.append(fixed_line.strip())
@@ -695,11 +1005,17 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
 
         md_text, defective_lines = sanitize_table(md_text)
         # Process each line and identify table blocks
-        for line in md_text.split("\n"):
+        for line in io.StringIO(md_text):  # streamed; strip() drops the trailing "\n"
+            if "|" not in line:
+                # cannot be a table row: blank lines are skipped, any other text ends the table
+                if current_table and not line.isspace():
+                    tables.append(current_table)
+                    current_table = []
+                continue
             stripped_line = line.strip()
 
             if stripped_line.startswith("|") and stripped_line.endswith("|"):
-                if len(stripped_line.replace("|", "").replace("-", "").replace(":", "").strip()) == 0:
+                if _is_separator(stripped_line, _PIPE_DASH_COLON):
                     table_found = True
                     if len(current_table) == 1:
                         current_table = []
@@ -725,49 +1041,40 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
             table_rows = [row.strip("|").strip() for row in table]
 
             # Get model's field order
-            model_fields = list(model.__annotations__.keys())
+            model_fields = _model_fields(model)
+            annotations = model.__annotations__
+            coercers = [_CELL_COERCERS.get(annotations[field], _cell_to_str) for field in model_fields]
 
             if column_id is not None:
-                while True:
-                    i_h = 0
-                    for i, row in enumerate(table_rows):
-                        cols = [str(col).rstrip() for col in row.split("|")]
-                        i_h = i
-                        if len(cols) < column_id + 1 or i == 0:
-                            continue
-                        if len(cols[column_id]) == 0:
-                            parent_row = table_rows[i - 1]
-                            parent_cols = [str(col).rstrip() for col in parent_row.split("|")]
-                            for j, parent_col in enumerate(parent_cols):
-                                parent_cols[j] = parent_col + " <br> " + cols[j] if j != column_id else parent_col
-                            table_rows[i - 1] = "|".join(parent_cols)
-                            table_rows.pop(i)
-                            break
-                    if i_h == len(table_rows) - 1:
-                        break
+                # One forward pass: a row with an empty key column continues the last kept row
+                merged_rows = []
+                parent_cols = None  # split of merged_rows[-1], kept while children collapse into it
+                for i, row in enumerate(table_rows):
+                    cols = [col.rstrip() for col in row.split("|")]
+                    if i == 0 or len(cols) < column_id + 1 or len(cols[column_id]) != 0:
+                        merged_rows.append(row)
+                        parent_cols = cols
+                        continue
+                    for j, parent_col in enumerate(parent_cols):
+                        # rstrip keeps the cached cells identical to a fresh split of the joined row
+                        parent_cols[j] = (parent_col + " <br> " + cols[j]).rstrip() if j != column_id else parent_col
+                    merged_rows[-1] = "|".join(parent_cols)
+                table_rows = merged_rows
 
             for row in table_rows:
-                cols = [remove_markdown(col).strip() for col in row.split("|")]
+                # only cells holding a '*' or '_' can carry emphasis markers
+                cols = [remove_markdown(col) if "*" in col or "_" in col else col.strip() for col in row.split("|")]
 
                 # Convert values to match the model
                 data_dict = {}
                 for i, field in enumerate(model_fields):
                     if len(cols) == i:
                         break
-                    field_type = model.__annotations__[field]  # Get expected type
-
-                    # Convert types dynamically
-                    if field_type == int:
-                        data_dict[field] = int(cols[i]) if cols[i].isdigit() else None
-                    elif field_type == float:
-                        data_dict[field] = float(cols[i]) if re.match(r"^\d+(\.\d+)?$", cols[i]) else None
-                    elif field_type == bool:
-                        data_dict[field] = cols[i].lower() in ["true", "yes", "1"]
-                    else:
-                        data_dict[field] = cols[i]  # Default to str
+                    # Convert types dynamically (anything but int/float/bool stays a str)
+                    data_dict[field] = coercers[i](cols[i])
 
                 # Create a Pydantic instance
-                instance = model(**data_dict)
+                instance = _build_instance(model, data_dict)
                 instances.append(instance)
 
         return instances, defective_lines
@@ -789,34 +1096,45 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
             List[BaseModel]: A list of instances of the provided Pydantic model.
         """
         def extract_json_from_text(text: str) -> dict:
-            json_match = re.search(r"```(?:json)?\s*([\s\S]*?)\s*```", text)
+            json_match = _JSON_FENCE_RE.search(text)
             if not json_match:
-                json_match = re.search(r"({[\s\S]*})", text)
+                json_match = _JSON_OBJECT_RE.search(text)
             if not json_match:
                 return None
             json_str = json_match.group(1).strip()
             try:
-                return commentjson.loads(json_str)
+                return loads_commented_json(json_str)
             except Exception as e:
                 return None
 
-        def reduce_json_complex_value(value, indent=0):
-            indent_str = "    " * indent
+        def reduce_json_complex_value(value, indent=0, parts=None):
+            # fragments of the whole nested value go into one list, joined once at the top level
+            top = parts is None
+            if top:
+                parts = []
+            indent_str = _INDENTS[indent] if indent < len(_INDENTS) else "    " * indent
             if isinstance(value, list):
                 if all(isinstance(v, str) for v in value):
-                    return indent_str + ", ".join(v.strip() for v in value)
+                    parts.append(indent_str + ", ".join(v.strip() for v in value))
                 else:
-                    formatted_list = [f"{indent_str}- {reduce_json_complex_value(v, indent + 1)}" for v in value]
-                    return "<br>".join(formatted_list)
+                    for i, v in enumerate(value):
+                        if i:
+                            parts.append("<br>")
+                        parts.append(indent_str + "- ")
+                        reduce_json_complex_value(v, indent + 1, parts)
 
             elif isinstance(value, dict):
-                formatted_dict = [
-                    f"{indent_str}- **{k}**: {reduce_json_complex_value(v, indent + 1)}"
-                    for k, v in value.items()
-                ]
-                return "<br>".join(formatted_dict)
+                for i, (k, v) in enumerate(value.items()):
+                    if i:
+                        parts.append("<br>")
+                    parts.append(f"{indent_str}- **{k}**: ")
+                    reduce_json_complex_value(v, indent + 1, parts)
 
-            return indent_str + str(value).strip()  # Default case (if it's a simple value)
+            else:
+                parts.append(indent_str + str(value).strip())  # Default case (if it's a simple value)
+
+            if top:
+                return "".join(parts)
 
 
         json_data = extract_json_from_text(text)
@@ -825,49 +1143,37 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
         if not json_data:
             return []
         instances = []
-        items = None
         if isinstance(json_data, dict):
-            for key, value in json_data.items():
-                if isinstance(value, list):
-                    items = value
-                    break
-                if isinstance(value, dict):
-                    items = [value]
-                    break
+            # rows are the first list value (or the first object value, as a single row)
+            items = next(
+                (value if isinstance(value, list) else [value]
+                 for value in json_data.values() if isinstance(value, (list, dict))),
+                None,
+            )
         elif isinstance(json_data, list):
             items = json_data
         else:
             return []
 
+        field_items = tuple((field, field_type, _JSON_COERCERS.get(field_type)) for field, field_type in model.__annotations__.items())
         for item in items:
             item_data = {}
+            normalized_keys = {k.lower(): k for k in item.keys()}
 
-            for field, field_type in model.__annotations__.items():
-                normalized_keys = {k.lower(): k for k in item.keys()}
+            for field, field_type, coerce in field_items:
                 matching_key = normalized_keys.get(field.lower(), None)
                 if matching_key is None:
                     continue
-                value = item.get(matching_key, "")
-
-                value = item.get(field, "")
+                value = item[matching_key]
 
                 # Convert types dynamically based on the model
-                if field_type == str and not isinstance(value, str):
-                    value = reduce_json_complex_value(value)
-                elif field_type == str:
-                    value = str(value)
-                elif field_type == int:
-                    value = int(value) if str(value).isdigit() else None
-                elif field_type == float:
-                    try:
-                        value = float(value)
-                    except ValueError:
-                        value = None
-                elif field_type == bool:
-                    value = str(value).lower() in ["true", "yes", "1"]
+                if field_type == str:
+                    value = str(value) if isinstance(value, str) else reduce_json_complex_value(value)
+                elif coerce is not None:
+                    value = coerce(value)
                 item_data[field] = value  # Default to str
 
-            instances.append(model(**item_data))
+            instances.append(_build_instance(model, item_data))
 
         return instances
 
@@ -895,10 +1201,13 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
         :param fields: List of tuples (field_name, field_type, Field(...))
         :return: A dynamically created Pydantic model type with a unique name
         """
-        unique_name = f"Model_{uuid.uuid4().hex}"  # Generate a unique name
-        field_definitions = {fname: (ftype, fdefault) for fname, ftype, fdefault in fields}
-        Config = self._config_with_enum_values()
-        return create_model(unique_name, __config__=Config, **field_definitions)
+        def build():
+            unique_name = f"Model_{next(_model_ids)}"  # Generate a unique name
+            field_definitions = {fname: (ftype, fdefault) for fname, ftype, fdefault in fields}
+            Config = self._config_with_enum_values()
+            return create_model(unique_name, __config__=Config, **field_definitions)
+
+        return _cached_model(("generate", _fields_signature(fields)), build)
 
     def extend_pydantic_model(
         self,
@@ -912,38 +1221,23 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
         :param new_fields: List of tuples (field_name, field_type, default_or_Field).
         :return: A new Pydantic model class with extended fields.
         """
-        unique_name = f"{base_model.__name__}_Extended_{uuid.uuid4().hex}"
-
-        # Extract all fields from the base model
-        combined_fields = {}
-
-        for name, field in base_model.__fields__.items():
-            # Reconstruct a fresh Field() using the metadata inside field.field_info
-            default = field.default if field.default is not None else ...
-            field_info = field.field_info
-            new_default = Field(
-                default,
-                title=field_info.title,
-                description=field_info.description,
-                alias=field.alias,
-                const=field_info.const,
-                gt=field_info.gt,
-                ge=field_info.ge,
-                lt=field_info.lt,
-                le=field_info.le,
-                multiple_of=field_info.multiple_of,
-                max_length=field_info.max_length,
-                min_length=field_info.min_length,
-                regex=field_info.regex,
-                example=field_info.extra.get("example") if field_info.extra else None,
-            )
-            combined_fields[name] = (field.outer_type_, new_default)
+        def build():
+            unique_name = f"{base_model.__name__}_Extended_{next(_model_ids)}"
 
-        # Merge new fields
-        for name, typ, default in new_fields:
-            combined_fields[name] = (typ, default)
-        Config = self._config_with_enum_values()
-        return create_model(unique_name, __config__=Config, **combined_fields)
+            # Extract all fields from the base model
+            combined_fields = {}
+
+            for name, field in base_model.__fields__.items():
+                # Reuse the parsed metadata; copied because create_model mutates FieldInfo in place
+                combined_fields[name] = (field.outer_type_, copy.copy(field.field_info))
+
+            # Merge new fields
+            for name, typ, default in new_fields:
+                combined_fields[name] = (typ, default)
+            Config = self._config_with_enum_values()
+            return create_model(unique_name, __config__=Config, **combined_fields)
+
+        return _cached_model(("extend", base_model, _fields_signature(new_fields)), build)
 
     def zip_pydantic_lists(
         self,
@@ -993,23 +1287,39 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
                 **{k: v for k, v in list2[0].__fields__.items() if k not in common_fields}  # Avoid duplicate PK
             }
             # Create a new merged Pydantic model dynamically
-            unique_model_name = f"MergedModel_{uuid.uuid4().hex[:8]}"
-            zipped_class = create_model(unique_model_name, **merged_fields)
+            unique_model_name = f"MergedModel_{next(_model_ids)}"
+            zipped_class = create_model(
+                unique_model_name,
+                **{name: (field.outer_type_, copy.copy(field.field_info)) for name, field in merged_fields.items()}
+            )
 
         # Build merged objects
         merged_objects = []
-        lookup_dict = {getattr(obj, common_field): obj for obj in list2}
+        get_key = attrgetter(common_field)
+        lookup_dict = dict(zip(map(get_key, list2), list2))
+        merged_field_names = tuple(merged_fields.keys())
+
+        # Per (class1, class2): (field, obj1 has it, obj2 has it), resolved once instead of per object
+        plans = {}
 
         for obj1 in list1:
-            common_value = getattr(obj1, common_field)
-            obj2 = lookup_dict.get(common_value)
+            obj2 = lookup_dict.get(get_key(obj1))
 
             if obj2:
+                classes = (type(obj1), type(obj2))
+                plan = plans.get(classes)
+                if plan is None:
+                    obj1_fields = obj1.__fields__
+                    obj2_fields = obj2.__fields__
+                    plan = plans[classes] = tuple(
+                        (field, field in obj1_fields, field in obj2_fields) for field in merged_field_names
+                    )
                 merged_data = {}  # Start fresh with only allowed fields
-                for field in merged_fields.keys():
-                    if field in obj1.__fields__ and getattr(obj1, field):
-                        merged_data[field] = getattr(obj1, field)
-                    elif obj2 and field in obj2.__fields__:
+                for field, in_obj1, in_obj2 in plan:
+                    value = getattr(obj1, field) if in_obj1 else None
+                    if value:
+                        merged_data[field] = value
+                    elif in_obj2:
                         merged_data[field] = getattr(obj2, field)
 
                 merged_objects.append(zipped_class(**merged_data))
@@ -1022,46 +1332,46 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
         if not isinstance(pydantic_objects, list):
             pydantic_objects = [pydantic_objects]
         if isinstance(excluded_fields, str):
-            excluded_fields = {excluded_fields}
+            excluded_fields = frozenset((excluded_fields,))
         elif isinstance(excluded_fields, list):
-            excluded_fields = set(excluded_fields)
+            excluded_fields = frozenset(excluded_fields)
         else:
-            excluded_fields = set()
-
-        # Get the Pydantic model class from the first object
-        model_class = type(pydantic_objects[0])
+            excluded_fields = frozenset()
 
-        # Extract field names and descriptions
-        model_class.__fields__ = model_class.__fields__
-        headers = [
-            model_class.__fields__[field].field_info.description if model_class.__fields__[field].field_info.description else field
-            for field in model_class.__fields__
-            if field not in excluded_fields
-        ]
-        separator = "| " + " | ".join(["-" * len(header) for header in headers]) + " |"
+        # Columns, header rows and row getter come from the first object's model, built once per exclusion set
+        included, header, fetch = _table_layout(type(pydantic_objects[0]), excluded_fields)
 
-        # Format table header
-        header_row = "| " + " | ".join(headers) + " |"
-
-        # Format table rows
+        # Format table rows; objects missing a field fall back to ''
         rows = []
-
         for obj in pydantic_objects:
-            row = "| " + " | ".join(str(getattr(obj, field, '')).replace("\n","<br>") for field in model_class.__fields__ if field not in excluded_fields) + " |"
-            rows.append(row)
+            try:
+                values = fetch(obj) if fetch else [getattr(obj, field, '') for field in included]
+            except AttributeError:
+                values = [getattr(obj, field, '') for field in included]
+            rows.append("| " + " | ".join([str(value).replace("\n", "<br>") for value in values]) + " |")
 
         # Compile table
-        table = "\n".join([header_row, separator] + rows)
-
-        return table
+        return "\n".join([header, *rows])
 
     def dump_pv1_model_list(self, models: Iterable[BaseModel]) -> str:
         """
         Serialize a list (or any iterable) of Pydantic models to a single JSON string.
         Safe for storage: UTF-8, no NaN/Infinity, compact, handles datetime/UUID/Decimal, etc.
+        With orjson installed the encoding runs in its native encoder (NaN/Infinity become null);
+        what it rejects (e.g. ints beyond 64 bits) goes through stdlib json.
         """
+        models = list(models)
+        if orjson is not None:
+            try:
+                return orjson.dumps(
+                    models,
+                    default=pydantic_encoder,        # models and pydantic types orjson doesn't know
+                    option=orjson.OPT_NON_STR_KEYS,  # json.dumps str()-ed int/enum keys too
+                ).decode()
+            except (TypeError, ValueError):
+                pass
         return json.dumps(
-            list(models),
+            models,
             default=pydantic_encoder,   # lets Pydantic encode its own types
             ensure_ascii=False,         # keep Unicode
             allow_nan=False,            # strict JSON
@@ -1072,7 +1382,14 @@ Again **UNDER NO CIRCUMSTANCES** teh following rules might be violated:
         """
         Deserialize a JSON string produced by dump_models back into a list of models of type `cls`.
         """
-        data = json.loads(s)
+        data = None
+        if orjson is not None and not _WIDE_DIGITS_RE.search(s):
+            try:
+                data = orjson.loads(s)
+            except (TypeError, ValueError):
+                pass
+        if data is None:
+            data = json.loads(s)
         if not isinstance(data, list):
             raise ValueError("Expected a JSON array.")
         return [cls.parse_obj(item) for item in data]
@@ -4,6 +4,7 @@ from __future__ import annotations
 import asyncio, re
 import time
 import traceback
+from functools import lru_cache
 from typing import Any, List, Optional, Tuple, Type, Union
 
 from langchain_core.messages import AIMessage, HumanMessage
@@ -14,6 +15,115 @@ from langchain.output_parsers.fix import OutputFixingParser
 from pydantic.v1 import BaseModel, Field, ValidationError, create_model
 
 
+# Runaway-output guards used by the completion parser
+_RE_RUNS = re.compile(r'-{101,}| {101,}')
+# System turn prepended to every string prompt; shared, never mutated
+_SYSTEM_INSTRUCTION = (
+    "You are going to be submitted a prompt somehow involved in the development or architecturing of a software system.\n"
+    "There are 2 things you should pay attention to:\n"
+    "1) Biases:\n"
+    "- Follow the explicit bias-mitigation recommendations in the prompt if present.\n"
+    "2) Output format:\n"
+    "- Follow the requested output format rigorously.\n"
+    "- Do not include any extra comments besides the required output.\n"
+    "- Always return code enclosed within triple backticks if the output is code.\n"
+    "- Never terminate a response with an alphanumeric character.\n"
+    "- If a '.' is required to terminate the output, include it.\n"
+    "- Elements that are not part of the data must not be mixed with data."
+)
+_SYSTEM_MSG = {"role": "system", "content": _SYSTEM_INSTRUCTION}
+# Closers that make an untokened response look finished (is_complete heuristic)
+_END_CHARS = frozenset(('.', ';', '!', '?', "`", "}", "\n", "|", "-", "*", '"', "'", ">", "]", "”", "/", "】"))
+
+
+_MISSING = object()
+
+
+def _collapse_run(match: re.Match) -> str:
+    return match.group(0)[0] * 100
+
+
+@lru_cache(maxsize=256)
+def _reduce_class(cls: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """Model with only `fields` of `cls`; cached so repeated chains reuse one class."""
+    annotations = cls.__annotations__
+    model_fields = cls.__fields__
+    field_defs = {}
+    for field in fields:
+        annotation = annotations.get(field, _MISSING)
+        if annotation is _MISSING:
+            raise ValueError(f"Field {field} not found in {cls.__name__}")
+        field_defs[field] = (annotation, Field(description=model_fields[field].field_info.description))
+    return create_model(cls.__name__, **field_defs, __config__=cls.__config__)
+
+
+@lru_cache(maxsize=256)
+def _output_parser(output_vessel: Type[BaseModel]) -> Tuple[PydanticOutputParser, str]:
+    """Parser and its format instructions (a JSON-schema dump) for `output_vessel`."""
+    output_parser = PydanticOutputParser(pydantic_object=output_vessel)
+    return output_parser, output_parser.get_format_instructions()
+
+
+def _ensure_str_slow(x: Any) -> str:
+    """Full isinstance ladder behind _ensure_str."""
+    if x is None:
+        return ""
+    if isinstance(x, AIMessage):
+        x = x.content
+    if isinstance(x, (list, tuple)):
+        # try to extract a text-like leaf
+        if len(x) == 0:
+            return ""
+        # common LC/SDK shapes sometimes put .text/.value in first part
+        part0 = x[0]
+        txt = getattr(part0, "text", None)
+        if isinstance(txt, str):
+            return txt
+        val = getattr(getattr(part0, "text", None), "value", None)
+        if isinstance(val, str):
+            return val
+        return str(part0)
+    if not isinstance(x, str):
+        return str(x)
+    return x
+
+
+def _ai_message_str(message: AIMessage) -> str:
+    content = message.content
+    return content if type(content) is str else _ensure_str_slow(message)
+
+
+# Exact-type fast paths for _ensure_str; subclasses and containers take the slow path
+_STR_FAST = {
+    str: lambda x: x,
+    type(None): lambda _: "",
+    AIMessage: _ai_message_str,
+}
+
+
+def _ensure_str(x: Any) -> str:
+    """Best-effort: turn model output to a plain string."""
+    fast = _STR_FAST.get(type(x))
+    return fast(x) if fast is not None else _ensure_str_slow(x)
+
+
+def _can_construct_from(output_cls: Type[BaseModel], reduced_instance: BaseModel) -> bool:
+    """True when output_cls(**values) could only re-check what the reduced model validated:
+    no validators or constraints of its own, no aliases, and every missing field has a default."""
+    if output_cls.__validators__ or output_cls.__pre_root_validators__ or output_cls.__post_root_validators__:
+        return False
+    if output_cls.__config__.validate_all:
+        return False
+    present = reduced_instance.__fields__
+    for name, field in output_cls.__fields__.items():
+        if name in present:
+            if field.alias != name or field.field_info.get_constraints():
+                return False
+        elif field.required:
+            return False
+    return True
+
+
 class Logger:
     def log(self, tag: str, message: str):
         print(f"[{tag}] {message}")
@@ -28,32 +138,27 @@ def create_structured_output_chain(
     completion_expected_end_token: Optional[Union[str, Tuple[str, ...]]] = None,
     returns_code: bool = False,
     max_continuations: int = 4,
-    logger_fn = None
+    logger_fn = None,
+    hedge_retries: bool = False
 ):
     """Build a chain that:
       - builds a prompt (optionally with Pydantic format instructions),
       - calls `llm`,
       - if the model stalls, nudges it with "Continue..." messages a few times,
       - post-parses/fixes with OutputFixingParser (Pydantic or string).
+    With `hedge_retries`, attempts after a failed first one run concurrently and the
+    first success wins, instead of retrying one after the other.
     """
 
     # ---------- helpers for pydantic shape ----------
-    def reduce_class(cls: Type[BaseModel], fields: List[str]) -> Type[BaseModel]:
-        field_defs = {}
-        for field in fields:
-            if field in cls.__annotations__:
-                field_defs[field] = (
-                    cls.__annotations__[field],
-                    Field(description=cls.__fields__[field].field_info.description),
-                )
-            else:
-                raise ValueError(f"Field {field} not found in {cls.__name__}")
-        return create_model(cls.__name__, **field_defs, __config__=cls.__config__)
-
     def create_new_instance(output_cls: Type[BaseModel], reduced_instance: BaseModel = None) -> BaseModel:
         if reduced_instance is None:
             return output_cls()
-        data = reduced_instance.dict()
+        # field values as-is: no recursive .dict() serialisation of nested models
+        data = dict(reduced_instance)
+        if _can_construct_from(output_cls, reduced_instance):
+            # The reduced model already validated these values against the same annotations
+            return output_cls.construct(**data)
         try:
             return output_cls(**data)
         except ValidationError as e:
@@ -83,62 +188,47 @@ def create_structured_output_chain(
 
     if pydantic_output and not output_str:
         completion_expected_end_token = ("```", "}")
-        output_vessel = pydantic_output if output_fields is None else reduce_class(pydantic_output, output_fields)
-        output_parser = PydanticOutputParser(pydantic_object=output_vessel)
-        output_instructions = output_parser.get_format_instructions()
+        output_vessel = pydantic_output if output_fields is None else _reduce_class(pydantic_output, tuple(output_fields))
+        output_parser, output_instructions = _output_parser(output_vessel)
     else:
         output_instructions = ""
 
     # ---------- content utilities ----------
-    def _ensure_str(x: Any) -> str:
-        """Best-effort: turn model output to a plain string."""
-        if x is None:
-            return ""
-        if isinstance(x, AIMessage):
-            x = x.content
-        if isinstance(x, (list, tuple)):
-            # try to extract a text-like leaf
-            if len(x) == 0:
-                return ""
-            # common LC/SDK shapes sometimes put .text/.value in first part
-            part0 = x[0]
-            txt = getattr(part0, "text", None)
-            if isinstance(txt, str):
-                return txt
-            val = getattr(getattr(part0, "text", None), "value", None)
-            if isinstance(val, str):
-                return val
-            return str(part0)
-        if not isinstance(x, str):
-            return str(x)
-        return x
-
     def is_complete(text: Any) -> bool:
-        s = _ensure_str(text).strip()
+        return is_complete_stripped(_ensure_str(text).strip())
+
+    def is_complete_stripped(s: str) -> bool:
+        """is_complete for text the caller has already normalised and stripped."""
         if not s:
             return False
         if completion_expected_end_token is None:
             # heuristic: sentence-ish ending or closers
-            return s.endswith(('.', ';', '!', '?', "`", "}", "\n", "|", "-", "*", '"', "'", ">", "]", "”", "/", "】"))
+            return s[-1] in _END_CHARS
         if isinstance(completion_expected_end_token, tuple):
             return any(s.endswith(tok) for tok in completion_expected_end_token)
         return s.endswith(completion_expected_end_token)
 
+    # prompt header and fence nudge depend only on the output shape, fixed at build time
+    json_output = bool(pydantic_output) and not output_str
+    if json_output:
+        header = "You must produce valid JSON that matches the schema below. Enclose the output in a single fenced ```json code block."
+    elif output_str:
+        header = "You must produce only the requested string value with no surrounding commentary or markdown."
+    else:
+        header = ""
+
     def create_prompt(x: dict) -> str:
         question = x.get("question") or ""
-        if pydantic_output and not output_str:
-            header = "You must produce valid JSON that matches the schema below. Enclose the output in a single fenced ```json code block."
-        elif output_str:
-            header = "You must produce only the requested string value with no surrounding commentary or markdown."
-        else:
-            header = ""
         prompt = f"{question}\n{output_instructions}\n{header}".strip()
-        if pydantic_output and not output_str:
+        if json_output:
             prompt = f"{prompt}\nOnly output:\n```json\n"  # nudge fence start
         return prompt
 
     # ---------- post-processing runnable ----------
-    def create_completion_parser(llm, prompt: str, parser):
+    # One fixing parser per chain: llm and the parser shape are fixed at build time
+    fixing_parser = OutputFixingParser.from_llm(parser=output_parser if json_output else StrOutputParser(), llm=llm)
+
+    def create_completion_parser(llm, prompt: str):
         def ensure_ai_message(completion) -> AIMessage:
             # Normalize whatever came back into an AIMessage with string content
             if isinstance(completion, AIMessage):
@@ -164,43 +254,31 @@ def create_structured_output_chain(
                 return {"role": (message.get("role") or "user"), "content": _ensure_str(message.get("content", ""))}
             return {"role": "assistant", "content": _ensure_str(message)}
 
-        fixing_parser = OutputFixingParser.from_llm(parser=parser, llm=llm)
-
         @chain
         def completion_parser(completion: AIMessage):
             # Seed history with the original prompt + model’s first reply
             first = ensure_ai_message(completion)
+            first_message = convert_message(first)
             history = [
                 {"role": "user", "content": prompt},
-                convert_message(first),
+                first_message,
             ]
+            # assistant turns in order, kept alongside history so stitching needs no role filter
+            assistant_chunks = [first_message["content"]]
 
             current_completion = _ensure_str(first.content).strip()
             # Guard against empty or pathological outputs
-            compact = current_completion.replace(" ", "").replace("-", "")
-            while True:
-                m = re.search(r'-{101}', current_completion)
-                if m:
-                    i = m.start()
-                    end = re.compile(r'[^-]').search(current_completion, i)
-                    j = end.start() if end else len(current_completion)
-                    current_completion = current_completion[:i] + ('-' * 100) + current_completion[j:]
-                    continue
-                m = re.search(r' {101}', current_completion)
-                if m:
-                    i = m.start()
-                    end = re.compile(r'[^ ]').search(current_completion, i)
-                    j = end.start() if end else len(current_completion)
-                    current_completion = current_completion[:i] + (' ' * 100) + current_completion[j:]
-                    continue
-                break
-
-            if len(compact) == 0 or (len(current_completion) // max(1, len(compact))) >= 9:
-                ratio = len(current_completion) // max(1, len(compact))
+            # length without spaces/dashes, counted rather than built
+            compact_len = len(current_completion) - current_completion.count(" ") - current_completion.count("-")
+            # Collapse runaway dash/space runs to 100 characters in one linear pass
+            current_completion = _RE_RUNS.sub(_collapse_run, current_completion)
+
+            ratio = len(current_completion) // compact_len if compact_len else len(current_completion)
+            if compact_len == 0 or ratio >= 9:
                 raise ValueError(f"The response is empty or seems repeated. Text/Compact Ratio: {ratio}")
 
             turns = 0
-            while current_completion.lower() != "completed." and not is_complete(current_completion):
+            while current_completion.lower() != "completed." and not is_complete_stripped(current_completion):
                 if turns >= max_continuations:
                     raise ValueError("The LLM seems unable to complete its response within the continuation limit")
 
@@ -220,13 +298,15 @@ def create_structured_output_chain(
                 nxt = ensure_ai_message(next_chunk)
                 current_completion = _ensure_str(nxt.content).strip()
                 if current_completion.lower() != "completed.":
-                    history.append(convert_message(nxt))
+                    next_message = convert_message(nxt)
+                    history.append(next_message)
+                    assistant_chunks.append(next_message["content"])
                 else:
                     break
                 turns += 1
 
             # Stitch all assistant turns together
-            assembled = "".join(m["content"] for m in history if m["role"] == "assistant")
+            assembled = "".join(assistant_chunks)
             fixed = fixing_parser.parse(assembled)
             return fixed.strip() if isinstance(fixed, str) else fixed
 
@@ -235,31 +315,15 @@ def create_structured_output_chain(
     # ---------- the main async chain ----------
     @chain
     async def chain_fn(x):
-        async def ainvoke(runnable, prompt: Union[str, List[dict]], retries=3):
+        async def ainvoke(runnable, prompt: Union[str, List[dict]], retries=3, hedged=hedge_retries):
             last_exception = None
             timeout_threshold = 50
-            # logger.log("PROMPT", prompt)
-            for attempt in range(retries):
+
+            async def attempt_once(attempt: int):
                 start_time = time.time()
                 try:
                     if isinstance(prompt, str):
-                        system_instruction = (
-                            "You are going to be submitted a prompt somehow involved in the development or architecturing of a software system.\n"
-                            "There are 2 things you should pay attention to:\n"
-                            "1) Biases:\n"
-                            "- Follow the explicit bias-mitigation recommendations in the prompt if present.\n"
-                            "2) Output format:\n"
-                            "- Follow the requested output format rigorously.\n"
-                            "- Do not include any extra comments besides the required output.\n"
-                            "- Always return code enclosed within triple backticks if the output is code.\n"
-                            "- Never terminate a response with an alphanumeric character.\n"
-                            "- If a '.' is required to terminate the output, include it.\n"
-                            "- Elements that are not part of the data must not be mixed with data."
-                        )
-                        messages = [
-                            {"role": "system", "content": system_instruction},
-                            {"role": "user", "content": prompt},
-                        ]
+                        messages = [_SYSTEM_MSG, {"role": "user", "content": prompt}]
                         output = await runnable.ainvoke(messages)
                     else:
                         output = await runnable.ainvoke(prompt)
@@ -267,12 +331,35 @@ def create_structured_output_chain(
                     return output
                 except Exception as e:
                     elapsed = time.time() - start_time
-                    last_exception = e
                     msg = f"Attempt {attempt+1} failed"
+                    # format the stack only for slow failures and the last attempt
                     if elapsed > timeout_threshold:
                         logger.log("ERROR", f"{msg} after {elapsed:.2f}s. {e}\n{traceback.format_exc()}")
-                    else:
+                    elif attempt == retries - 1:
                         logger.log("ERROR", f"{msg}. Cause: {e}\n{traceback.format_exc()}")
+                    else:
+                        logger.log("ERROR", f"{msg}. Cause: {e!r}")
+                    raise
+
+            # logger.log("PROMPT", prompt)
+            # hedged: only the first attempt runs alone, the remaining ones race each other below
+            for attempt in range(1 if hedged else retries):
+                try:
+                    return await attempt_once(attempt)
+                except Exception as e:
+                    last_exception = e
+            if hedged and retries > 1:
+                pending = {asyncio.create_task(attempt_once(attempt)) for attempt in range(1, retries)}
+                try:
+                    while pending:
+                        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            if task.exception() is None:
+                                return task.result()
+                            last_exception = task.exception()
+                finally:
+                    for task in pending:
+                        task.cancel()
             logger.log("ERROR", f"All {retries} retry attempts failed.")
             raise RuntimeError(f"All {retries} retry attempts failed.") from last_exception
 
@@ -282,7 +369,7 @@ def create_structured_output_chain(
                 if not output_fields:
                     raise ValueError("output_str=True requires at least one output field.")
                 prompt = create_prompt(x)
-                completion_parser = create_completion_parser(llm, prompt, StrOutputParser())
+                completion_parser = create_completion_parser(llm, prompt)
                 composed = llm | completion_parser
                 out = await ainvoke(composed, prompt)
                 # return a full instance with the single field set
@@ -291,7 +378,7 @@ def create_structured_output_chain(
                 return inst
             else:
                 prompt = create_prompt(x)
-                completion_parser = create_completion_parser(llm, prompt, output_parser)
+                completion_parser = create_completion_parser(llm, prompt)
                 composed = llm | completion_parser
                 out = await ainvoke(composed, prompt)
                 if output_vessel == pydantic_output:
@@ -299,7 +386,7 @@ def create_structured_output_chain(
                 return create_new_instance(pydantic_output, out)
         else:
             prompt = create_prompt(x)
-            completion_parser = create_completion_parser(llm, prompt, StrOutputParser())
+            completion_parser = create_completion_parser(llm, prompt)
             composed = llm | completion_parser
             return await ainvoke(composed, prompt)
 
@@ -9,29 +9,32 @@ import weakref
 _installed = False
 
 
-def _run_coro_in_fresh_loop(coro):
-    """Run a coroutine to completion on a fresh loop in a helper thread."""
-    result_holder = {"exc": None}
-    done = threading.Event()
-
-    def _runner():
-        try:
+_finalizer_loop = None
+_finalizer_lock = threading.Lock()
+
+
+def _ensure_finalizer_loop():
+    """Long-lived loop on a daemon thread shared by every finalizer run from inside a loop."""
+    global _finalizer_loop
+    loop = _finalizer_loop
+    if loop is not None:
+        return loop
+    with _finalizer_lock:
+        if _finalizer_loop is None:
             loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                loop.run_until_complete(coro)
-            finally:
-                loop.run_until_complete(loop.shutdown_asyncgens())
-                loop.close()
-        except Exception as e:
-            result_holder["exc"] = e
-        finally:
-            done.set()
-
-    t = threading.Thread(target=_runner, daemon=True)
-    t.start()
-    done.wait(timeout=5.0)  # best-effort
-    # don't re-raise at shutdown; this is a finalizer
+            threading.Thread(target=loop.run_forever, daemon=True).start()
+            _finalizer_loop = loop
+        return _finalizer_loop
+
+
+def _run_coro_in_fresh_loop(coro):
+    """Run a coroutine on the shared helper-thread loop, waiting at most 5s for it."""
+    fut = asyncio.run_coroutine_threadsafe(coro, _ensure_finalizer_loop())
+    try:
+        fut.result(timeout=5.0)  # best-effort
+    except Exception:
+        # don't re-raise at shutdown; this is a finalizer
+        pass
     return
 
 
@@ -60,6 +63,11 @@ async def _aclose_api_client(api_client):
 
 def _finalize_api_client(api_client):
     """Sync finalizer that ensures the internal aiohttp session is closed."""
+    # Nothing to close (the library already closed its session): skip the event-loop round-trip
+    close = getattr(api_client, "aclose", None) or getattr(api_client, "close", None)
+    sess = getattr(api_client, "_aiohttp_session", None)
+    if not callable(close) and (sess is None or getattr(sess, "closed", False)):
+        return
     try:
         loop = asyncio.get_running_loop()
     except RuntimeError:
@@ -12,3 +12,8 @@ from classes.infrastructure.PromptOrchestratorSidekick import PromptOrchestrator
 class Node(BaseModel):
     uid: str = Field(..., description="UID for the content")
     content: str = Field(..., description="Content")
+
+class StaticReportSection(BaseModel):
+    id: str = Field("", description="Specification ID")
+    title: str = Field("", description="Section Title")
+    content: str = Field("", description="Content")
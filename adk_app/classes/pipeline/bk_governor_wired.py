@@ -1,16 +1,19 @@
-import io, re, os, json, time, uuid
+import io, re, os, json, time, uuid, random, queue
 import zipfile
 from datetime import datetime
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 import asyncio
+import logging
 import traceback
 from dataclasses import dataclass, field, asdict
 from typing import Any, Callable, Dict, List, Optional, Tuple, Type
 import inspect
 
-from google.adk.sessions import InMemorySessionService
+from google.adk.sessions import InMemorySessionService, Session
 from google.genai import types
 from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
 
 from classes.mem_utils import leak_guard_genai as lg
 lg.install()
@@ -18,17 +21,110 @@ lg.install()
 from classes.models.models import BoundComponentDefinition_w_Helper, ComponentMethod, FileDefinition
 from classes.pipeline.logging_functions_factory import LoggingFunctionsFactory
 
+from classes.infrastructure.ADKLLM import new_event_loop
 from classes.infrastructure.PromptOrchestratorAgent import PromptOrchestratorAgent
 from classes.infrastructure.PromptOrchestratorSidekick import PromptOrchestratorSidekick
 from classes.bk_agents.step_1 import Step_1
 from classes.bk_agents.step_2 import Step_2
 
 APP_NAME = "adk-prod-pipeline"
+# zlib level for the result archive: generated text deflates well even at 1, at a fraction of the CPU of 6
+ZIP_COMPRESSLEVEL = int(os.environ.get("PIPELINE_ZIP_LEVEL", "1"))
+# Entries this small gain nothing from deflate (headers outweigh the savings): store them as-is
+ZIP_STORE_BELOW = 256
+# threads cleaning/encoding file contents while the zip writer deflates the previous ones
+ZIP_ENCODE_WORKERS = 4
+# run-log threshold (DEBUG, INFO, ...): per-step detail lines are DEBUG and skipped entirely above it
+PIPELINE_LOG_LEVEL = logging.getLevelNamesMapping().get(os.environ.get("PIPELINE_LOG_LEVEL", "DEBUG").upper(), logging.DEBUG)
+
+# resolved once: the per-event loop calls it unbound instead of probing every event
+_EVENT_IS_FINAL = getattr(Event, "is_final_response", None)
+# agent class -> whether _run_async_impl is an async generator function (fixed per class)
+_ASYNC_GEN_IMPL: Dict[type, bool] = {}
+
+# step retries: exponential backoff with jitter, capped
+RETRY_BASE_DELAY_S = 0.5
+RETRY_MAX_DELAY_S = 30.0
+# bugs, not transient failures: another attempt would fail the same way
+_NON_RETRYABLE_ERRORS = (TypeError, AttributeError, NameError, ImportError, NotImplementedError)
+
+def _retry_delay(attempt: int) -> float:
+    """Delay before attempt+1; the jitter keeps steps that failed together from retrying together."""
+    return min(RETRY_MAX_DELAY_S, RETRY_BASE_DELAY_S * 2 ** (attempt - 1) * (0.5 + random.random()))
+
+def _is_retryable(e: BaseException) -> bool:
+    """HTTP-style errors retry on 408/429/5xx only; other errors retry unless they are programming errors."""
+    for attr in ("code", "status_code", "status"):
+        code = getattr(e, attr, None)
+        if isinstance(code, int) and 400 <= code < 600:
+            return code in (408, 429) or code >= 500
+    return not isinstance(e, _NON_RETRYABLE_ERRORS)
+
+# stateless: one instance serves every run (and the zip-building worker threads)
+_SIDEKICK = PromptOrchestratorSidekick()
+
+# finished runs hand their (emptied) session service back for the next run
+SESSION_POOL_SIZE = 4
+_SESSION_SERVICES: "queue.SimpleQueue[InMemorySessionService]" = queue.SimpleQueue()
+
+def _acquire_session_service() -> InMemorySessionService:
+    try:
+        return _SESSION_SERVICES.get_nowait()
+    except queue.Empty:
+        return InMemorySessionService()
+
+async def _release_session_service(svc: InMemorySessionService, run_id: str) -> None:
+    """
+    Delete every session of the run (the run's own plus one per step agent and spawned child),
+    then pool the service; a service that can't be emptied is dropped.
+    """
+    try:
+        listed = await svc.list_sessions(app_name=APP_NAME, user_id=run_id)
+        for session in listed.sessions:
+            await svc.delete_session(app_name=APP_NAME, user_id=run_id, session_id=session.id)
+        # sessions/user_state/app_state are private InMemorySessionService dicts (checked against
+        # google-adk's in-memory service; looked up by name, skipped if missing). Drop the run's
+        # per-user buckets the deletes leave behind, and the app: state, so neither the pooled
+        # service's size nor one run's state carries over to the next run.
+        for store in (getattr(svc, "sessions", None), getattr(svc, "user_state", None)):
+            if isinstance(store, dict):
+                store.get(APP_NAME, {}).pop(run_id, None)
+        app_state = getattr(svc, "app_state", None)
+        if isinstance(app_state, dict):
+            app_state.pop(APP_NAME, None)
+    except Exception:
+        return
+    if _SESSION_SERVICES.qsize() < SESSION_POOL_SIZE:
+        _SESSION_SERVICES.put(svc)
+
+def _final_event_test(event: Any) -> Callable[[Any], bool]:
+    """
+    Picks the "is this the final response" test once per event stream, from its first event:
+    is_final_response() when the event type has one, else turn_complete and not partial.
+    """
+    if isinstance(event, Event):
+        is_final_response = _EVENT_IS_FINAL
+    else:
+        is_final_response = getattr(type(event), "is_final_response", None)
+        if not callable(is_final_response):
+            is_final_response = None
+
+    def is_final(e: Any) -> bool:
+        if is_final_response is not None:
+            try:
+                if is_final_response(e):
+                    return True
+            except Exception:
+                pass
+        return bool(getattr(e, "turn_complete", False)) and not bool(getattr(e, "partial", False))
+
+    return is_final
 
-# >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
-# Single shared InvocationContext for the whole pipeline
-SHARED_CTX: Optional[InvocationContext] = None
-# <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+def _is_async_gen_impl(agent_cls: type) -> bool:
+    is_gen = _ASYNC_GEN_IMPL.get(agent_cls)
+    if is_gen is None:
+        is_gen = _ASYNC_GEN_IMPL[agent_cls] = inspect.isasyncgenfunction(agent_cls._run_async_impl)
+    return is_gen
 
 def _on_job_internal_status(code: int, max_code: int, message: str):
     pct = 0 if max_code == 0 else int(100 * min(code, max_code) / max_code)
@@ -42,6 +138,15 @@ class StepResult:
     error: Optional[str] = None
     duration_s: float = 0.0
 
+_TABLE_RULE = "+-------------------------------+----------+----------+---------------------------+\n"
+_TABLE_HEADER = (
+    "\n"
+    + _TABLE_RULE
+    + "| Step                          | Success  | Attempts | Duration                  |\n"
+    + _TABLE_RULE
+)
+_TABLE_FOOTER = _TABLE_RULE + "\n"
+
 @dataclass
 class PipelineSummary:
     steps: List[StepResult] = field(default_factory=list)
@@ -50,23 +155,65 @@ class PipelineSummary:
         return {"steps": [asdict(s) for s in self.steps]}
 
     def print_table(self):
-        str_report = "\n"
-        str_report += "+-------------------------------+----------+----------+---------------------------+\n"
-        str_report += "| Step                          | Success  | Attempts | Duration                  |\n"
-        str_report += "+-------------------------------+----------+----------+---------------------------+\n"
+        parts = [_TABLE_HEADER]
         for s in self.steps:
             ok = "yes" if s.success else "no"
             dur = f"{s.duration_s:.2f}s"
-            str_report += f"| {s.name:<29} | {ok:<8} | {s.attempts:^8} | {dur:<25} |\n"
-        str_report += "+-------------------------------+----------+----------+---------------------------+\n"
-        str_report += "\n"
-        return str_report
-
-pipeline = None
-
+            parts.append(f"| {s.name:<29} | {ok:<8} | {s.attempts:^8} | {dur:<25} |\n")
+        parts.append(_TABLE_FOOTER)
+        return "".join(parts)
 
-def build_and_save_final_zip(state: Dict[str, Any], logger) -> str:
-    sk = PromptOrchestratorSidekick()
+@dataclass
+class PipelineRun:
+    """Per-run pipeline state, passed around instead of module globals so runs can overlap."""
+    run_id: str
+    session_service: InMemorySessionService
+    summary: PipelineSummary = field(default_factory=PipelineSummary)
+    # fetched once at pipeline start; every step context shares it (and its state)
+    session: Optional[Session] = None
+    # Single shared InvocationContext for the whole run (created by the first step)
+    ctx: Optional[InvocationContext] = None
+
+
+def _step_levels(steps: List[Tuple[Type[PromptOrchestratorAgent], str, Tuple[str, ...]]]) -> List[List[Tuple[Type[PromptOrchestratorAgent], str]]]:
+    """Group (agent_cls, step_name, depends_on) into levels; a level only depends on earlier ones."""
+    remaining = {name: (agent_cls, tuple(deps)) for agent_cls, name, deps in steps}
+    unknown = {dep for _, deps in remaining.values() for dep in deps if dep not in remaining}
+    if unknown:
+        raise ValueError(f"Unknown step dependencies: {sorted(unknown)}")
+    done: set = set()
+    levels = []
+    while remaining:
+        level = [(agent_cls, name) for name, (agent_cls, deps) in remaining.items() if done.issuperset(deps)]
+        if not level:
+            raise ValueError(f"Cyclic step dependencies among: {sorted(remaining)}")
+        for _, name in level:
+            del remaining[name]
+            done.add(name)
+        levels.append(level)
+    return levels
+
+
+# formats that are compressed already: deflate burns CPU on them for next to no gain
+_PRECOMPRESSED_EXTS = frozenset((
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".rar", ".jar", ".whl",
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".ico",
+    ".pdf", ".mp3", ".mp4", ".webm", ".ogg", ".woff", ".woff2",
+))
+
+def _zip_compress_type(name: str, data: bytes) -> int:
+    if len(data) < ZIP_STORE_BELOW or os.path.splitext(name)[1].lower() in _PRECOMPRESSED_EXTS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _encoded_entry(definition: FileDefinition) -> Tuple[str, bytes]:
+    name = str(definition.file_name).lstrip("/\\").replace("\\", "/")
+    return name, _SIDEKICK.clean_triple_backticks(definition.content).encode("utf-8")
+
+
+def build_and_save_final_zip(state: Dict[str, Any], logger, run: PipelineRun) -> str:
+    sk = _SIDEKICK
     file_definitions = sk.load_pv1_model_list(FileDefinition,state.get("file_definitions", ""))
     components_definitions = sk.load_pv1_model_list(
         BoundComponentDefinition_w_Helper, state.get("components_definitions", "")
@@ -80,123 +227,126 @@ def build_and_save_final_zip(state: Dict[str, Any], logger) -> str:
         "\n\n### Component Methods definitions:\n" + sk.serialize_pydantic_objects_to_table(components_API, ["original_IDs", "method_ID"]) +
         "\n\n# File Definitions:\n" + sk.serialize_pydantic_objects_to_table(file_definitions, ["content", "dependencies", "language_structural_elements", "file_ID"]) +
         "\n\n# Static Report:\n" + static_report +
-        "\n\n# Execution Report:\n" + pipeline.print_table()
+        "\n\n# Execution Report:\n" + run.summary.print_table()
     )
 
     # Path where the final zip will be saved
     output_zip_path = f"./results/result_files_{datetime.now().strftime('%d-%m-%y-%H_%M_%S')}.zip"
 
-    buf = io.BytesIO()
-    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zipf:
-        for definition in file_definitions:
-            zipf.writestr(str(definition.file_name).lstrip("/\\").replace("\\", "/"), sk.clean_triple_backticks(definition.content).encode("utf-8"))
-        zipf.writestr("README.md", readme.encode("utf-8"))
-    buf.seek(0)
-    data = buf.getvalue()
-
+    # Write the archive straight to disk; the caller gets its path and streams it from there
     os.makedirs(os.path.dirname(output_zip_path), exist_ok=True)
-    with open(output_zip_path, "wb") as f:
-        f.write(data)
-    return data
+    # Entries are cleaned and encoded on pool threads, in order, while this thread deflates
+    # (zlib drops the GIL), so the two stages overlap instead of alternating
+    with open(output_zip_path, "wb") as f, ThreadPoolExecutor(max_workers=ZIP_ENCODE_WORKERS) as ex:
+        with zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESSLEVEL) as zipf:
+            for name, data in ex.map(_encoded_entry, file_definitions):
+                zipf.writestr(name, data, compress_type=_zip_compress_type(name, data))
+            readme_data = readme.encode("utf-8")
+            zipf.writestr("README.md", readme_data, compress_type=_zip_compress_type("README.md", readme_data))
+    return output_zip_path
 
 
 async def _run_agent_step(
     agent_cls: Type[PromptOrchestratorAgent],
     step_name: str,
     model_name: str,
-    session_service: InMemorySessionService,
-    run_id: str,
+    run: PipelineRun,
     fixed_inputs: Dict[str, Any],
     logger: Any,
     status_fn: Any,
     max_retries: int,
 ) -> StepResult:
-    global SHARED_CTX
-    global pipeline
-
+    session_service = run.session_service
     attempt = 0
     start_t = time.time()
     attempt_errors: List[Dict[str, Any]] = []
 
+    # inputs and model don't change between attempts: one agent and context per step.
+    # aclose() after each attempt drops the agent's LLM, so a retry still starts on a fresh one.
+    agent = agent_cls(
+        model_name=model_name,
+        fixed_inputs=fixed_inputs,
+        status_notifier=status_fn,
+        logger=logger,
+        session_service=session_service,
+        user_id=run.run_id,
+        app_name=APP_NAME,
+        name=f"{step_name}.{uuid.uuid4().hex[:6]}",
+    )
+    # no await between the check and the assignment, so concurrent steps can't both create it
+    if run.ctx is None:
+        run.ctx = ctx = InvocationContext(
+            session_service=session_service,
+            session=run.session,
+            agent=agent,
+            invocation_id=uuid.uuid4().hex,
+        )
+    else:
+        # same session object (shared state); own agent/invocation so concurrent steps don't clash
+        ctx = run.ctx.model_copy(update={"agent": agent, "invocation_id": uuid.uuid4().hex})
+
+    is_async_gen = _is_async_gen_impl(agent_cls)
+
     while attempt < max_retries:
         attempt += 1
+        if attempt > 1:
+            ctx.invocation_id = uuid.uuid4().hex
         try:
-            agent = agent_cls(
-                model_name=model_name,
-                fixed_inputs=fixed_inputs,
-                status_notifier=status_fn,
-                logger=logger,
-                session_service=session_service,
-                user_id=run_id,
-                app_name=APP_NAME,
-                name=f"{step_name}.{attempt:02d}.{uuid.uuid4().hex[:6]}",
-            )
-
-            if SHARED_CTX is None:
-                session = await session_service.get_session(app_name=APP_NAME, user_id=run_id, session_id=run_id)
-                SHARED_CTX = InvocationContext(
-                    session_service=session_service,
-                    session=session,
-                    agent=agent,
-                    invocation_id=uuid.uuid4().hex,
-                )
-            else:
-                SHARED_CTX.agent = agent
-                SHARED_CTX.invocation_id = uuid.uuid4().hex
-
             final_text = None
-            gen = agent._run_async_impl(SHARED_CTX)
-            if inspect.isasyncgen(gen):
+            gen = agent._run_async_impl(ctx)
+            if is_async_gen:
+                is_final = None
                 async for event in gen:
-                    is_final = False
-                    if hasattr(event, "is_final_response") and callable(getattr(event, "is_final_response")):
-                        try:
-                            is_final = event.is_final_response()
-                        except Exception:
-                            is_final = False
-                    if not is_final:
-                        is_final = bool(getattr(event, "turn_complete", False)) and not bool(getattr(event, "partial", False))
-                    if is_final and getattr(event, "content", None) and getattr(event.content, "parts", None):
+                    if is_final is None:
+                        is_final = _final_event_test(event)
+                    if is_final(event) and getattr(event, "content", None) and getattr(event.content, "parts", None):
                         part = event.content.parts[0]
                         if getattr(part, "text", None):
                             final_text = part.text
             else:
                 await gen
 
-            logger("STEP_FINAL_TEXT", {"step": step_name, "attempt": attempt, "text": final_text or ""})
-            logger("SESSION_KEYS", {"step": step_name, "keys": list(SHARED_CTX.session.state.keys())})
+            logger("STEP_FINAL_TEXT", level=logging.DEBUG, payload_fn=lambda: {"step": step_name, "attempt": attempt, "text": final_text or ""})
+            logger("SESSION_KEYS", level=logging.DEBUG, payload_fn=lambda: {"step": step_name, "keys": list(run.ctx.session.state.keys())})
 
             return StepResult(name=step_name, success=True, attempts=attempt, duration_s=time.time() - start_t)
 
         except Exception as e:
             tb = traceback.format_exc()
+            retryable = _is_retryable(e)
             err_payload: Dict[str, Any] = {
                 "step": step_name,
                 "attempt": attempt,
                 "type": type(e).__name__,
                 "message": str(e),
+                "retryable": retryable,
                 "traceback": tb,
             }
             # snapshot any child/agent errors the step may have written to state
             try:
-                if SHARED_CTX and SHARED_CTX.session and isinstance(SHARED_CTX.session.state, dict):
-                    sess_errs = SHARED_CTX.session.state.get("errors")
+                if run.ctx and run.ctx.session and isinstance(run.ctx.session.state, dict):
+                    sess_errs = run.ctx.session.state.get("errors")
                     if sess_errs:
                         err_payload["session_errors_snapshot"] = sess_errs
             except Exception:
                 pass
 
             attempt_errors.append(err_payload)
-            logger("STEP_ERROR_DETAIL", err_payload)
-            status_fn(0, 0, f"{step_name} {'Failed.' if attempt >= max_retries else f'Attempting Failover {attempt + 1}'}")
-            await asyncio.sleep(0.25)
+            logger("STEP_ERROR_DETAIL", err_payload, level=logging.ERROR)
+            give_up = attempt >= max_retries or not retryable
+            status_fn(0, 0, f"{step_name} {'Failed.' if give_up else f'Attempting Failover {attempt + 1}'}")
+            if give_up:
+                break
+            await asyncio.sleep(_retry_delay(attempt))
+        finally:
+            await agent.aclose()
 
     # persist full error history for this step in session state
     try:
-        if SHARED_CTX and SHARED_CTX.session and isinstance(SHARED_CTX.session.state, dict):
-            SHARED_CTX.session.state.setdefault("errors", {})
-            SHARED_CTX.session.state["errors"].setdefault("steps", {})
-            SHARED_CTX.session.state["errors"]["steps"][step_name] = attempt_errors
+        if run.ctx and run.ctx.session and isinstance(run.ctx.session.state, dict):
+            run.ctx.session.state.setdefault("errors", {})
+            run.ctx.session.state["errors"].setdefault("steps", {})
+            run.ctx.session.state["errors"]["steps"][step_name] = attempt_errors
     except Exception:
         # best-effort; don't mask original failure
         pass
@@ -216,59 +366,66 @@ async def main_async(
     run_id: str,
     status_event_sink: Callable[[int, int, str], Any],
     max_retries: int = 3,
+    max_concurrency: int = 2,
 ) -> Dict[str, Any]:
-    global SHARED_CTX
-    global pipeline
-
-    svc = InMemorySessionService()
+    svc = _acquire_session_service()
     try:
         await svc.create_session(app_name=APP_NAME, user_id=run_id, session_id=run_id)
     except Exception:
         pass
+    session = await svc.get_session(app_name=APP_NAME, user_id=run_id, session_id=run_id)
 
-    lf = LoggingFunctionsFactory()
+    lf = LoggingFunctionsFactory(min_level=PIPELINE_LOG_LEVEL)
     on_status = lf.make_status_fn(status_event_sink)
-    logger = lf.make_logger_fn("./logs", run_id)
+    # JSON lines: error payloads (tracebacks, session snapshots) serialize natively and stay one line each
+    logger = lf.make_logger_fn("./logs", run_id, json_lines=True)
 
     logger("START", f"Starting job:{run_id} model{model}")
 
-    pipeline = PipelineSummary()
+    run = PipelineRun(run_id=run_id, session_service=svc, session=session)
     fixed_inputs_common = {"problem_statement": problem_statement}
 
     _common = dict(
         model_name=model,
-        session_service=svc,
-        run_id = run_id,
+        run=run,
         fixed_inputs=fixed_inputs_common,
         logger=logger,
         status_fn=on_status,
         max_retries=max_retries,
     )
 
+    # (agent_cls, step_name, depends_on): steps whose dependencies are all done run together
     _steps = [
-        (Step_1, "Step 1"),
-        (Step_2, "Step 2"),
+        (Step_1, "Step 1", ()),
+        (Step_2, "Step 2", ("Step 1",)),
     ]
 
-    for agent_cls, step_name in _steps:
-        step = await _run_agent_step(agent_cls=agent_cls, step_name=step_name, **_common)
-        pipeline.steps.append(step)
-        if not step.success:
-            SHARED_CTX = None
-            return {"status":"failure"}
+    semaphore = asyncio.Semaphore(max_concurrency)
 
+    async def _run_limited(agent_cls, step_name):
+        async with semaphore:
+            return await _run_agent_step(agent_cls=agent_cls, step_name=step_name, **_common)
+
+    try:
+        for level in _step_levels(_steps):
+            steps = await asyncio.gather(*[_run_limited(agent_cls, step_name) for agent_cls, step_name in level])
+            run.summary.steps.extend(steps)
+            if not all(step.success for step in steps):
+                return {"status":"failure"}
 
-    state = dict(SHARED_CTX.session.state) if SHARED_CTX else {}
-    # file_definitions = state.get("file_definitions")
-    zip_bytes = build_and_save_final_zip(state , logger)
 
-    # Cleanup shared ctx for next run
-    SHARED_CTX = None
+        state = dict(run.ctx.session.state) if run.ctx else {}
+        # file_definitions = state.get("file_definitions")
+        # deflate + disk I/O off the event loop (zlib releases the GIL)
+        zip_path = await asyncio.to_thread(build_and_save_final_zip, state, logger, run)
+    finally:
+        lf.close()
+        await _release_session_service(svc, run_id)
 
     return {
         "status":"success",
         "run_id": run_id,
-        "zip_bytes": zip_bytes,
+        "zip_path": zip_path,
     }
 
 def main(
@@ -277,6 +434,7 @@ def main(
     run_id: str,
     status_event_sink: Callable[[int, int, str], Any],
     max_retries: int = 3,
+    max_concurrency: int = 2,
 ) -> Dict[str, Any]:
     return asyncio.run(
         main_async(
@@ -285,5 +443,7 @@ def main(
             run_id = run_id,
             status_event_sink = status_event_sink,
             max_retries=max_retries,
-        )
+            max_concurrency=max_concurrency,
+        ),
+        loop_factory=new_event_loop,
     )
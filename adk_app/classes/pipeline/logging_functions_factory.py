@@ -1,6 +1,43 @@
-import os, threading
+import os, json, logging, queue, threading
 from datetime import datetime
 import asyncio, inspect, threading
+from typing import Any, Callable, Optional
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is the fallback
+    orjson = None
+
+_LOG_FLUSH_LINES = 64
+_LOG_FLUSH_SECONDS = 0.1
+
+# async status sinks called with no loop to run on go to one long-lived loop on a daemon thread
+_sink_loop = None
+_sink_loop_lock = threading.Lock()
+
+
+def _ensure_sink_loop():
+    global _sink_loop
+    loop = _sink_loop
+    if loop is not None:
+        return loop
+    with _sink_loop_lock:
+        if _sink_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="status-sink-loop", daemon=True).start()
+            _sink_loop = loop
+        return _sink_loop
+
+
+def _json_line(label, message) -> str:
+    """One log record as a single JSON line; values JSON can't encode (models, sets...) are str()-ed."""
+    record = {"label": label, "message": message}
+    if orjson is not None:
+        try:
+            return orjson.dumps(record, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE).decode()
+        except TypeError:
+            pass  # e.g. ints beyond 64 bits: let stdlib json handle it
+    return json.dumps(record, default=str, ensure_ascii=False) + "\n"
 
 class LoggingFunctionsFactory:
     """
@@ -30,11 +67,48 @@ lf = LoggingFunctionsFactory(event_sink=my_host.on_event)
 status_fn(5, 100, "warming up")
 logger_fn("INFO", "starting up")
     """
-    def __init__(self, loop= None):
+    def __init__(self, loop= None, min_level: int = logging.DEBUG):
         self.current_value = 0
+        # logger calls below this (logging-module) level are dropped before their payload is built
+        self.min_level = min_level
         self.completion_value = None
         self.status = ""
         self.loop = loop
+        self._log_files = []
+        # log lines go through one queue drained by a single writer thread (started lazily)
+        self._log_queue = queue.SimpleQueue()
+        self._log_writer = None
+
+    def _drain_logs(self):
+        pending = set()
+        written = 0
+        while True:
+            try:
+                item = self._log_queue.get(timeout=_LOG_FLUSH_SECONDS)
+            except queue.Empty:
+                item = ()
+            if item is None or not item or written >= _LOG_FLUSH_LINES:
+                for log_file in pending:
+                    log_file.flush()
+                pending.clear()
+                written = 0
+            if item is None:
+                return
+            if item:
+                log_file, line = item
+                log_file.write(line)
+                pending.add(log_file)
+                written += 1
+
+    def close(self):
+        """Flush and close the files opened by make_logger_fn; later log calls are dropped."""
+        if self._log_writer is not None:
+            self._log_queue.put(None)
+            self._log_writer.join()
+            self._log_writer = None
+        for log_file in self._log_files:
+            log_file.close()
+        self._log_files.clear()
 
 
     def set_event_sink(self, sink):
@@ -75,11 +149,8 @@ logger_fn("INFO", "starting up")
             try:
                 res = self.fire_event(payload)
                 if inspect.isawaitable(res):
-                    if loop is not None:
-                        asyncio.run_coroutine_threadsafe(res, loop)
-                    else:
-                        # fire-and-forget on a tiny helper thread
-                        threading.Thread(target=lambda: asyncio.run(res), daemon=True).start()
+                    # fire-and-forget; without a loop of our own, on the shared sink loop (one thread, ever)
+                    asyncio.run_coroutine_threadsafe(res, loop if loop is not None else _ensure_sink_loop())
             except Exception as e:
                 print(f"Exception while printing status:{e}")
                 pass  # never break the worker
@@ -117,21 +188,34 @@ logger_fn("INFO", "starting up")
 
         return fn
 
-    def make_logger_fn(self, log_dir: str, run_id: str):
+    def make_logger_fn(self, log_dir: str, run_id: str, json_lines: bool = False):
         """
-        Returns fn(label: str, message: str) that writes to:
+        Returns fn(label: str, message: str, level=logging.INFO, payload_fn=None) that writes to:
         <log_dir>/<run_id><YYYY-MM-DD>.log
+        Calls below self.min_level are dropped; pass payload_fn=lambda: {...} instead of message
+        so the payload is only built when the line is actually written.
+        json_lines=True writes each call as {"label": ..., "message": ...} on one line
+        (orjson when installed) instead of "[label] message".
         """
         os.makedirs(log_dir, exist_ok=True)
         date_str = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         filepath = os.path.join(log_dir, f"{run_id}.log")
-        lock = threading.RLock()
-
-        def fn(label: str, message: str) -> None:
-            line = f"[{label}] {message}\n"
-            with lock:
-                with open(filepath, "a", encoding="utf-8") as f:
-                    f.write(line)
+        # opened once; the writer thread flushes every _LOG_FLUSH_LINES lines or _LOG_FLUSH_SECONDS
+        log_file = open(filepath, "a", encoding="utf-8")
+        self._log_files.append(log_file)
+        if self._log_writer is None:
+            self._log_writer = threading.Thread(target=self._drain_logs, daemon=True)
+            self._log_writer.start()
+        put = self._log_queue.put
+
+        def fn(label: str, message: Any = None, level: int = logging.INFO, payload_fn: Optional[Callable[[], Any]] = None) -> None:
+            if level < self.min_level:
+                return
+            if payload_fn is not None:
+                message = payload_fn()
+            # formatted here so later mutation of `message` can't change what gets logged
+            if not log_file.closed:
+                put((log_file, _json_line(label, message) if json_lines else f"[{label}] {message}\n"))
         fn("LOG",f"Start:{run_id}{date_str}")
         return fn
 
@@ -1,4 +1,4 @@
-from dotmap import DotMap
+from dataclasses import dataclass
 
 #  ██████  ██       ██████  ██████   █████  ██
 # ██       ██      ██    ██ ██   ██ ██   ██ ██
@@ -17,9 +17,10 @@ from dotmap import DotMap
 # ██      ██   ██ ██    ██ ██  ██  ██ ██         ██         ██
 # ██      ██   ██  ██████  ██      ██ ██         ██    ███████
 
-GLOBAL_PROMPTS = DotMap(
-    {
-        "system_analyst_prompt":"""
+@dataclass(frozen=True, slots=True)
+class _Prompts:
+    """Read-only prompt constants; each one is a plain slot attribute (GLOBAL_PROMPTS.system_analyst_prompt)."""
+    system_analyst_prompt: str = """
 You are a Supercalifragilistic System Analyst Engine specialized in multilayered systems interface design.
 Please consider the following:
 
@@ -104,5 +105,6 @@ Instructions:
         Don't use graphical notations or diagrams in your response.
         Stick to the problem_statement and be as thorough as possible, this will influence the entirety of the project.
 """
-    }
-)
+
+
+GLOBAL_PROMPTS = _Prompts()
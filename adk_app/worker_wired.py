@@ -5,14 +5,28 @@ import time
 import json
 import logging
 import signal
+import select
 import zipfile
 import io
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta, datetime
 from dotenv import load_dotenv
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is the fallback
+    orjson = None
 load_dotenv()
 
+import socket
 import pg8000.dbapi
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from google.auth.transport.requests import AuthorizedSession
 from google.cloud import storage, secretmanager
+try:
+    from google.cloud.storage import transfer_manager
+except ImportError:  # google-cloud-storage < 2.10: large artifacts use the single resumable stream
+    transfer_manager = None
 from google.api_core.exceptions import NotFound as GcpNotFound, DeadlineExceeded
 from google.oauth2 import service_account
 from google.auth import default as google_auth_default
@@ -25,6 +39,22 @@ logging.basicConfig(
 )
 log = logging.getLogger("worker")
 
+
+class _KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled sockets send TCP keepalives, so idle connections survive between jobs."""
+    _SOCKET_OPTIONS = HTTPConnection.default_socket_options + [
+        (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+        *[(socket.IPPROTO_TCP, opt, val) for opt, val in (
+            (getattr(socket, "TCP_KEEPIDLE", None), 30),
+            (getattr(socket, "TCP_KEEPINTVL", None), 10),
+            (getattr(socket, "TCP_KEEPCNT", None), 3),
+        ) if opt is not None],
+    ]
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = self._SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
 class JobWorker:
     """
     Class-based refactor of the original script.
@@ -43,12 +73,31 @@ class JobWorker:
         self.DB_SECRET_ID        = os.environ.get("DB_SECRET_ID")
 
         self.POLL_SLEEP_SECONDS  = float(os.environ.get("POLL_SLEEP_SECONDS", "0.5"))
+        # idle: wait for the frontend's NOTIFY on this channel, re-polling anyway every IDLE_POLL_SECONDS
+        self.JOB_NOTIFY_CHANNEL  = os.environ.get("JOB_NOTIFY_CHANNEL", "jobs_new")
+        self.IDLE_POLL_SECONDS   = float(os.environ.get("IDLE_POLL_SECONDS", "30"))
+        # longest a NOTIFY buffered inside the driver can wait before a SELECT 1 picks it up
+        self.NOTIFY_DRAIN_SECONDS = float(os.environ.get("NOTIFY_DRAIN_SECONDS", "2"))
         self.PROCESS_SIM_STEPS   = int(os.environ.get("PROCESS_SIM_STEPS", "6"))
         self.STEP_SLEEP_SECONDS  = float(os.environ.get("STEP_SLEEP_SECONDS", "10.0"))
+        # the reused connection is pinged before use once it has been idle this long
+        self.DB_PING_AFTER_SECONDS = float(os.environ.get("DB_PING_AFTER_SECONDS", "30"))
+        # progress ticks that only move the percentage are persisted at most this often
+        self.STATUS_MIN_INTERVAL_SECONDS = float(os.environ.get("STATUS_MIN_INTERVAL_SECONDS", "1.0"))
+        # resumable upload chunk (a multiple of 256 KiB, as GCS requires)
+        self.GCS_CHUNK_SIZE      = int(os.environ.get("GCS_CHUNK_SIZE", str(8 * 1024 * 1024)))
+        self.GCS_UPLOAD_TIMEOUT  = float(os.environ.get("GCS_UPLOAD_TIMEOUT", "300"))
+        # artifacts from this size up are sent as parallel multipart chunks
+        self.GCS_PARALLEL_THRESHOLD = int(os.environ.get("GCS_PARALLEL_THRESHOLD", str(150 * 1024 * 1024)))
+        self.GCS_PARALLEL_CHUNK_SIZE = int(os.environ.get("GCS_PARALLEL_CHUNK_SIZE", str(32 * 1024 * 1024)))
+        self.GCS_PARALLEL_WORKERS = int(os.environ.get("GCS_PARALLEL_WORKERS", "8"))
 
         # ---------- State ----------
         self.busy = False
         self.shutdown = False
+        # one DB connection for the worker's lifetime, shared by the poll loop and job handling
+        self._conn = None
+        self._conn_used_at = 0.0
 
         # ---------- Credentials & clients ----------
         self.bucket_creds = self._build_creds()
@@ -59,11 +108,16 @@ class JobWorker:
             log.info("******************************\nUNABLE TO RETRIEVE CREDENTIALS\n******************************")
             raise
 
-        self.storage_client = storage.Client(credentials=self.bucket_creds)
+        self.storage_client = storage.Client(credentials=self.bucket_creds, _http=self._build_storage_http())
+        self._bucket = self.storage_client.bucket(self.BUCKET_NAME)
         self.secret_client = (
             secretmanager.SecretManagerServiceClient(credentials=self.bucket_creds)
             if self.DB_PASSWORD is None and self.DB_SECRET_ID else None
         )
+        # side work overlapped with the job's critical path (e.g. URL signing during the upload)
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="worker-aux")
+        # uploads + final status of finished jobs, one at a time, while the main loop claims the next job
+        self._publisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="worker-publish")
 
         # ---------- Signals ----------
         signal.signal(signal.SIGINT, self._graceful_shutdown)
@@ -78,6 +132,16 @@ class JobWorker:
         creds, _ = google_auth_default(scopes=scopes)
         return creds
 
+    def _build_storage_http(self) -> AuthorizedSession:
+        """
+        HTTP session for GCS: a pool sized for the parallel upload and signing threads,
+        over keepalive sockets, so an upload after an idle stretch reuses a warm TLS connection.
+        """
+        session = AuthorizedSession(self.bucket_creds)
+        pool_size = max(16, self.GCS_PARALLEL_WORKERS + 2)
+        session.mount("https://", _KeepAliveAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+        return session
+
     # ---------- DB helpers ----------
     def _get_db_password(self) -> str:
         if self.DB_PASSWORD:
@@ -101,6 +165,47 @@ class JobWorker:
         return conn
 
 
+    def _get_conn(self):
+        """The worker's long-lived connection; reopened if it was dropped or fails the idle ping."""
+        conn = self._conn
+        if conn is not None and time.monotonic() - self._conn_used_at > self.DB_PING_AFTER_SECONDS:
+            try:
+                cur = conn.cursor()
+                try:
+                    cur.execute("SELECT 1")
+                    cur.fetchone()
+                finally:
+                    cur.close()
+            except Exception:
+                log.warning("DB connection went stale; reconnecting")
+                self._drop_conn()
+                conn = None
+        if conn is None:
+            conn = self.db_connect()
+            cur = conn.cursor()
+            try:
+                cur.execute(f'LISTEN "{self.JOB_NOTIFY_CHANNEL}"')
+            finally:
+                cur.close()
+            self._conn = conn
+        self._conn_used_at = time.monotonic()
+        return conn
+
+    def _drop_conn(self) -> None:
+        """Close and forget the shared connection; the next _get_conn() opens a fresh one."""
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _commit(conn) -> None:
+        # pg8000 sends a COMMIT round trip even in autocommit mode (where it's a no-op with a warning)
+        if not getattr(conn, "autocommit", False):
+            conn.commit()
+
     def test_db_connectivity(self) -> None:
         try:
             conn = self.db_connect()
@@ -118,6 +223,39 @@ class JobWorker:
             log.exception("DB connectivity test FAILED to %s:%d db=%s as %s", self.DB_HOST, self.DB_PORT, self.DB_NAME, self.DB_USER)
             sys.exit(3)
 
+    def ensure_job_indexes(self) -> None:
+        """
+        Creates (once, online) the indexes the hot queries rely on: a partial index serving the claim's
+        "oldest PENDING" pick, independent of how many finished jobs the table holds, and a job_id index
+        for status lookups/updates unless one exists already (e.g. the primary key). Best-effort:
+        a role without DDL rights just logs a warning.
+        """
+        try:
+            conn = self._get_conn()  # autocommit: required by CREATE INDEX CONCURRENTLY
+            cur = conn.cursor()
+            try:
+                cur.execute(
+                    "CREATE INDEX CONCURRENTLY IF NOT EXISTS jobs_pending_created "
+                    "ON jobs (created_at) WHERE status = 'PENDING'"
+                )
+                cur.execute(
+                    """
+                    SELECT 1
+                      FROM pg_index i
+                      JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+                     WHERE i.indrelid = 'jobs'::regclass AND a.attname = 'job_id'
+                     LIMIT 1
+                    """
+                )
+                if cur.fetchone() is None:
+                    cur.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS jobs_by_id ON jobs (job_id)")
+            finally:
+                cur.close()
+            log.info("Job indexes in place")
+        except Exception:
+            log.warning("Could not ensure job indexes (non-fatal)", exc_info=True)
+            self._drop_conn()
+
     def update_job_status(self, conn, job_id: str, status: str, error_message: str | None = None, result_url: str | None = None) -> int:
         cur = conn.cursor()
         try:
@@ -132,11 +270,36 @@ class JobWorker:
                 """,
                 (status, error_message, result_url, job_id),
             )
-            conn.commit()
+            self._commit(conn)
             return cur.rowcount or 0
         finally:
             cur.close()
 
+    def finalize_job(self, conn, job_id: str, status: str, error_message: str | None = None, result_url: str | None = None) -> None:
+        """Writes the job's terminal status and frees the worker in one statement."""
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                """
+                WITH j AS (
+                    UPDATE jobs
+                       SET status = %s,
+                           error_message = %s,
+                           result_url = %s,
+                           updated_at = CURRENT_TIMESTAMP
+                     WHERE job_id = %s
+                )
+                UPDATE worker_state
+                   SET is_busy = FALSE,
+                       last_updated = CURRENT_TIMESTAMP
+                 WHERE id = 'singleton'
+                """,
+                (status, error_message, result_url, job_id),
+            )
+            self._commit(conn)
+        finally:
+            cur.close()
+
     def set_worker_busy(self, conn, busy: bool) -> None:
         cur = conn.cursor()
         try:
@@ -144,7 +307,7 @@ class JobWorker:
                 "UPDATE worker_state SET is_busy = %s, last_updated = CURRENT_TIMESTAMP WHERE id = 'singleton'",
                 (busy,)
             )
-            conn.commit()
+            self._commit(conn)
         finally:
             cur.close()
 
@@ -158,16 +321,41 @@ class JobWorker:
             cur.close()
 
     # ---------- Storage helpers ----------
-
-    def _upload_to_gcs(self, bucket_name: str, blob_path: str, data: bytes, content_type: str = "application/zip"):
-        bucket = self.storage_client.bucket(bucket_name)
-        blob = bucket.blob(blob_path)
-        blob.upload_from_string(data, content_type=content_type)
+    def _get_bucket(self, bucket_name: str):
+        """The configured bucket's handle is built once; other names get a fresh one."""
+        if bucket_name == self.BUCKET_NAME:
+            return self._bucket
+        return self.storage_client.bucket(bucket_name)
+
+    def _upload_to_gcs(self, bucket_name: str, blob_path: str, file_path: str, content_type: str = "application/zip"):
+        bucket = self._get_bucket(bucket_name)
+        if transfer_manager is not None and os.path.getsize(file_path) >= self.GCS_PARALLEL_THRESHOLD:
+            # XML multipart upload: GCS_PARALLEL_WORKERS threads PUT file ranges at once,
+            # and the service assembles them into the one object (no part objects to compose/clean up)
+            transfer_manager.upload_chunks_concurrently(
+                file_path,
+                bucket.blob(blob_path),
+                content_type=content_type,
+                chunk_size=self.GCS_PARALLEL_CHUNK_SIZE,
+                worker_type=transfer_manager.THREAD,
+                max_workers=self.GCS_PARALLEL_WORKERS,
+                deadline=self.GCS_UPLOAD_TIMEOUT,
+            )
+            return f"gs://{bucket_name}/{blob_path}", f"https://storage.googleapis.com/{bucket_name}/{blob_path}"
+        # chunk_size makes this a resumable upload streamed from disk GCS_CHUNK_SIZE at a time
+        # (a failed chunk is retried alone); the archive is never held in memory
+        blob = bucket.blob(blob_path, chunk_size=self.GCS_CHUNK_SIZE)
+        blob.upload_from_filename(
+            file_path,
+            content_type=content_type,
+            checksum="crc32c",
+            timeout=self.GCS_UPLOAD_TIMEOUT,
+        )
         return f"gs://{bucket_name}/{blob_path}", f"https://storage.googleapis.com/{bucket_name}/{blob_path}"
 
     def _generate_signed_url(self, bucket_name: str, blob_path: str, expires_in_seconds: int = 3600) -> str | None:
         try:
-            bucket = self.storage_client.bucket(bucket_name)
+            bucket = self._get_bucket(bucket_name)
             blob = bucket.blob(blob_path)
             return blob.generate_signed_url(
                 version="v4",
@@ -180,18 +368,20 @@ class JobWorker:
             return None
 
     # ---------- Job processing ----------
-    def handle_message(self, job_id: str, client_payload: dict):
+    def run_pipeline(self, job_id: str, client_payload: dict) -> str | None:
+        """
+        Runs the pipeline for a claimed job on the calling thread.
+        Returns the result archive's path; on failure marks the job ERROR, frees the worker
+        (one statement) and returns None.
+        """
         self.busy = True
         conn = None
         try:
-            conn = self.db_connect()
-            if not self.fetch_job_exists(conn, job_id):
-                log.warning("Job %s not found in DB; marking error", job_id)
-                return "ERROR", "Job missing in DB", None
+            # claim_next_pending_job already marked the job RUNNING and the worker busy
+            conn = self._get_conn()
 
-            self.set_worker_busy(conn, True)
-            self.update_job_status(conn, job_id, status="RUNNING")
-            log.info("Job %s marked RUNNING", job_id)
+            # last persisted status: repeats are dropped, percentage-only ticks are rate-limited
+            last_status = {"text": None, "message": None, "ts": 0.0}
 
             def _db_status_sink(current_value, completion_value, status_message):
                 try:
@@ -201,9 +391,16 @@ class JobWorker:
                 except Exception:
                     pct = 0
                 status_text = f"{pct}% {status_message}" if status_message else f"{pct}%"
+                log.info("Job %s - %s", job_id, status_text)
+                now = time.monotonic()
+                if status_text == last_status["text"]:
+                    return
+                if (status_message == last_status["message"] and pct < 100
+                        and now - last_status["ts"] < self.STATUS_MIN_INTERVAL_SECONDS):
+                    return
                 try:
-                    log.info("Job %s - %s", job_id, status_text)
                     self.update_job_status(conn, job_id, status=status_text)
+                    last_status["text"], last_status["message"], last_status["ts"] = status_text, status_message, now
                 except Exception:
                     log.exception("Failed to persist intermediate status for job %s", job_id)
 
@@ -218,63 +415,102 @@ class JobWorker:
                 max_retries = 3,
             )
             if result["status"] == "success":
-                object_path = f"results/{job_id}/{job_id}.zip"
-                gs_url, https_url = self._upload_to_gcs(self.BUCKET_NAME, object_path, result["zip_bytes"])
-                signed_url = self._generate_signed_url(self.BUCKET_NAME, object_path, 3600)
-                final_url = signed_url or gs_url
-                log.info("Uploaded artifact: gs=%s, https=%s, signed=%s", gs_url, https_url, bool(signed_url))
-                self.update_job_status(conn, job_id, status="COMPLETED", result_url=final_url)
-                log.info("Job %s COMPLETED with result_url=%s", job_id, final_url)
-                return "COMPLETED", None, final_url
+                return result["zip_path"]
 
-            else:
-                log.exception("Job %s failed", job_id)
-                try:
-                    if conn:
-                        self.update_job_status(conn, job_id, status="ERROR")
-                except Exception:
-                    log.exception("Failed to persist ERROR state for job %s", job_id)
-                return "ERROR", None, None
+            log.error("Job %s failed", job_id)
+            try:
+                self.finalize_job(conn, job_id, status="ERROR")
+            except Exception:
+                log.exception("Failed to persist ERROR state for job %s", job_id)
+            return None
         except Exception as e:
             log.exception("Job %s failed", job_id)
             try:
                 if conn:
-                    self.update_job_status(conn, job_id, status="ERROR", error_message=str(e))
+                    self.finalize_job(conn, job_id, status="ERROR", error_message=str(e))
             except Exception:
                 log.exception("Failed to persist ERROR state for job %s", job_id)
-            return "ERROR", str(e), None
+                self._drop_conn()
+            return None
         finally:
+            self.busy = False
+
+    def publish_result(self, job_id: str, zip_path: str):
+        """
+        Uploads the archive, signs its URL and marks the job COMPLETED (ERROR if any of it fails).
+        Runs on the publisher thread, so it uses its own connection rather than the shared one.
+        """
+        conn = None
+        try:
+            object_path = f"results/{job_id}/{job_id}.zip"
+            # a V4 signature only needs the object name, so sign while the upload runs
+            fut_signed = self._executor.submit(self._generate_signed_url, self.BUCKET_NAME, object_path, 3600)
+            gs_url, https_url = self._upload_to_gcs(self.BUCKET_NAME, object_path, zip_path)
+            signed_url = fut_signed.result()
+            final_url = signed_url or gs_url
+            log.info("Uploaded artifact: gs=%s, https=%s, signed=%s", gs_url, https_url, bool(signed_url))
+            conn = self.db_connect()
+            self.update_job_status(conn, job_id, status="COMPLETED", result_url=final_url)
+            log.info("Job %s COMPLETED with result_url=%s", job_id, final_url)
+            return "COMPLETED", None, final_url
+        except Exception as e:
+            log.exception("Publishing results of job %s failed", job_id)
             try:
-                if conn:
+                conn = conn or self.db_connect()
+                self.update_job_status(conn, job_id, status="ERROR", error_message=str(e))
+            except Exception:
+                log.exception("Failed to persist ERROR state for job %s", job_id)
+            return "ERROR", str(e), None
+        finally:
+            if conn is not None:
+                try:
                     conn.close()
-            finally:
-                self.busy = False
+                except Exception:
+                    pass
+
+    def handle_message(self, job_id: str, client_payload: dict):
+        """Processes a claimed job end to end on the calling thread (pipeline, then publish)."""
+        zip_path = self.run_pipeline(job_id, client_payload)
+        if zip_path is None:
+            return "ERROR", None, None
+        return self.publish_result(job_id, zip_path)
+
     # ---------- Worker locking & queue ----------
-    def acquire_worker_lock(self, conn) -> bool:
+    def claim_next_pending_job(self, conn):
+        """
+        Claims the oldest PENDING job in one statement: the job flips to RUNNING and the worker
+        to busy atomically (upserting the worker_state row if it's missing, as the frontend's
+        busy check reads a missing row as idle). SKIP LOCKED lets concurrent workers each claim
+        a different job.
+        """
         cur = conn.cursor()
         try:
             cur.execute(
                 """
-                INSERT INTO worker_state (id, is_busy, last_updated)
-                VALUES ('singleton', TRUE, CURRENT_TIMESTAMP)
-                ON CONFLICT (id) DO UPDATE
-                SET is_busy = EXCLUDED.is_busy,
-                    last_updated = EXCLUDED.last_updated
-                WHERE worker_state.is_busy = TRUE
-                RETURNING id
+                WITH picked AS (
+                    SELECT job_id FROM jobs
+                     WHERE status = 'PENDING'
+                     ORDER BY created_at ASC
+                     LIMIT 1
+                       FOR UPDATE SKIP LOCKED
+                ), claimed AS (
+                    UPDATE jobs
+                       SET status = 'RUNNING',
+                           updated_at = CURRENT_TIMESTAMP
+                      FROM picked
+                     WHERE jobs.job_id = picked.job_id
+                 RETURNING jobs.job_id, jobs.client_request_data
+                ), busy AS (
+                    INSERT INTO worker_state (id, is_busy, last_updated)
+                    SELECT 'singleton', TRUE, CURRENT_TIMESTAMP
+                     WHERE EXISTS (SELECT 1 FROM claimed)
+                    ON CONFLICT (id) DO UPDATE
+                    SET is_busy = EXCLUDED.is_busy,
+                        last_updated = EXCLUDED.last_updated
+                )
+                SELECT job_id, client_request_data FROM claimed
                 """
             )
-            return cur.fetchone() is not None
-        finally:
-            cur.close()
-
-
-    def fetch_next_pending_job(self, conn):
-        cur = conn.cursor()
-        try:
-            cur.execute(
-                "SELECT job_id, client_request_data FROM jobs WHERE status = 'PENDING' ORDER BY created_at ASC LIMIT 1"
-            )
             row = cur.fetchone()
             if not row:
                 return None
@@ -282,18 +518,52 @@ class JobWorker:
             if isinstance(client_payload_raw, dict):
                 client_payload = client_payload_raw
             else:
-                client_payload = json.loads(client_payload_raw or "{}")
+                raw = client_payload_raw or "{}"
+                try:
+                    client_payload = orjson.loads(raw) if orjson is not None else json.loads(raw)
+                except ValueError:
+                    client_payload = json.loads(raw)  # e.g. >64-bit ints, which orjson rejects
             return job_id, client_payload
         finally:
             cur.close()
 
+    def wait_for_job_notification(self, conn, timeout: float) -> None:
+        """
+        Blocks until a NOTIFY on JOB_NOTIFY_CHANNEL reaches the (LISTENing) connection, or `timeout`
+        passes, or shutdown is requested. pg8000 only reads notifications while running a query,
+        so the socket is select()-ed and a SELECT 1 pulls messages in.
+        Falls back to a plain POLL_SLEEP_SECONDS sleep if the driver doesn't expose what's needed.
+        """
+        # conn._usock is private to pg8000 1.x's CoreConnection: the raw socket under the buffered
+        # conn._sock (a makefile() wrapper) that the driver reads through. A NOTIFY that landed in
+        # that buffer with an earlier reply leaves the raw socket unreadable, so the select() is
+        # capped at NOTIFY_DRAIN_SECONDS and every wakeup runs the SELECT 1 that drains it.
+        notifications = getattr(conn, "notifications", None)
+        sock = getattr(conn, "_usock", None)
+        if notifications is None or sock is None:
+            time.sleep(self.POLL_SLEEP_SECONDS)
+            return
+        deadline = time.monotonic() + timeout
+        while not notifications and not self.shutdown:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            select.select([sock], [], [], min(self.NOTIFY_DRAIN_SECONDS, remaining))
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT 1")
+                cur.fetchone()
+            finally:
+                cur.close()
+        notifications.clear()
+
     def release_worker_lock(self, conn) -> None:
         cur = conn.cursor()
         try:
             cur.execute(
                 "UPDATE worker_state SET is_busy = FALSE, last_updated = CURRENT_TIMESTAMP WHERE id = 'singleton'"
             )
-            conn.commit()
+            self._commit(conn)
         finally:
             cur.close()
 
@@ -308,40 +578,43 @@ class JobWorker:
                     time.sleep(self.POLL_SLEEP_SECONDS)
                     continue
 
-                conn = self.db_connect()
+                conn = self._get_conn()
                 try:
-                    job = self.fetch_next_pending_job(conn)
+                    job = self.claim_next_pending_job(conn)
                     if not job:
                         log.info("No pending jobs found.")
                         self.release_worker_lock(conn)
-                        conn.close()
-                        time.sleep(self.POLL_SLEEP_SECONDS)
+                        self.wait_for_job_notification(conn, self.IDLE_POLL_SECONDS)
                         continue
 
-                    self.acquire_worker_lock(conn)
-                    conn.close()
-
                     job_id, client_payload = job
-                    log.info("Picked up job %s; processing...", job_id)
-                    status, err, url = self.handle_message(job_id, client_payload)
-
-                    self.release_worker_lock(conn)
-                    conn.close()
+                    log.info("Picked up job %s (marked RUNNING); processing...", job_id)
+                    zip_path = self.run_pipeline(job_id, client_payload)
+                    if zip_path is not None:
+                        # free as soon as the pipeline is done: the publish overlaps the next job
+                        # (a failed run already freed the worker along with its ERROR status)
+                        self.release_worker_lock(self._get_conn())
+                        self._publisher.submit(self.publish_result, job_id, zip_path)
 
                 except Exception:
                     log.exception("Job handling failed")
+                    self._drop_conn()
                     try:
-                        self.release_worker_lock(conn)
-                        conn.close()
+                        self.release_worker_lock(self._get_conn())
                     except Exception:
                         log.exception("Error releasing DB lock")
+                        self._drop_conn()
                     time.sleep(2)
             except KeyboardInterrupt:
                 break
             except Exception:
                 log.exception("Loop error; sleeping briefly")
+                self._drop_conn()
                 time.sleep(2)
 
+        self._drop_conn()
+        self._publisher.shutdown(wait=True)  # let in-flight uploads finish and record their status
+        self._executor.shutdown(wait=False)
         log.info("Worker stopped.")
 
     # ---------- Signals ----------
@@ -352,6 +625,7 @@ class JobWorker:
 def main():
     worker = JobWorker()
     worker.test_db_connectivity()
+    worker.ensure_job_indexes()
     worker.run()
 
 if __name__ == "__main__":
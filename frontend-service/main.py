@@ -1,5 +1,8 @@
 # frontend-service/main.py
 import os
+import queue
+import hashlib
+import secrets
 import socket
 import sys
 import json
@@ -12,17 +15,37 @@ from dotenv import load_dotenv
 from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
 import time
 from werkzeug.exceptions import HTTPException, NotFound
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is the fallback
+    orjson = None
+try:
+    from pythonjsonlogger import jsonlogger
+except ImportError:  # optional: plain text log lines are the fallback
+    jsonlogger = None
 
 load_dotenv()
 
 app = Flask(__name__)
 
 # ---- Logging to stdout (Cloud Run picks this up) ----
-logging.basicConfig(
-    stream=sys.stdout,
-    level=logging.INFO,
-    format='[%(asctime)s] %(levelname)s %(name)s: %(message)s',
-)
+# One JSON object per line when python-json-logger is installed (LOG_JSON=false opts out):
+# Cloud Logging ingests the fields (and `extra=` context) as structured payload.
+LOG_JSON = jsonlogger is not None and os.getenv("LOG_JSON", "true").lower() == "true"
+if LOG_JSON:
+    _log_handler = logging.StreamHandler(sys.stdout)
+    _log_handler.setFormatter(jsonlogger.JsonFormatter(
+        "%(asctime)s %(levelname)s %(name)s %(message)s",
+        rename_fields={"levelname": "severity"},
+        json_default=str,
+    ))
+    logging.basicConfig(level=logging.INFO, handlers=[_log_handler])
+else:
+    logging.basicConfig(
+        stream=sys.stdout,
+        level=logging.INFO,
+        format='[%(asctime)s] %(levelname)s %(name)s: %(message)s',
+    )
 # Make Flask logger use root handlers (stdout)
 app.logger.handlers = logging.getLogger().handlers
 app.logger.setLevel(logging.INFO)
@@ -112,9 +135,21 @@ def _err_payload(e: Exception, status: int):
         payload["traceback"] = traceback.format_exc()
     return payload
 
+def _json_bytes(obj, default=None) -> bytes:
+    """JSON-encode to UTF-8 bytes: orjson when installed, stdlib json for what it rejects (e.g. >64-bit ints)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=default)
+        except TypeError:
+            pass
+    return json.dumps(obj, default=default).encode("utf-8")
+
 def _log_exception(msg: str, **ctx):
     # Full traceback to logs, plus structured context
-    ctx_str = json.dumps(ctx, default=str)
+    if LOG_JSON:
+        app.logger.exception(msg, extra=ctx)  # serialized once, by the JSON formatter
+        return
+    ctx_str = _json_bytes(ctx, default=str).decode("utf-8")
     app.logger.exception("%s | context=%s", msg, ctx_str)
 
 # --- Environment Variables ---
@@ -124,6 +159,8 @@ DB_USER = os.environ.get("DB_USER")
 DB_NAME = os.environ.get("DB_NAME")
 DB_PORT = os.environ.get("DB_PORT")
 DB_SECRET_ID = os.environ.get("DB_SECRET_ID")
+# the worker LISTENs here; a NOTIFY per inserted job wakes it instead of it polling
+JOB_NOTIFY_CHANNEL = os.environ.get("JOB_NOTIFY_CHANNEL", "jobs_new")
 
 if not all([PROJECT_ID, DB_HOST, DB_USER, DB_NAME, DB_SECRET_ID]):
     raise RuntimeError("Missing one or more required environment variables for Frontend Service.")
@@ -134,12 +171,19 @@ if not all([PROJECT_ID, DB_HOST, DB_USER, DB_NAME, DB_SECRET_ID]):
 secret_client = secretmanager.SecretManagerServiceClient()
 
 # --- Database Connection (Helper Functions) ---
+# Secret Manager is hit once per TTL, not once per connection; failed fetches are not cached
+DB_PASSWORD_TTL_SECONDS = float(os.environ.get("DB_PASSWORD_TTL_SECONDS", "3600"))
+_DB_PW_CACHE = {"pw": None, "exp": 0.0}
+
 def get_db_password():
-    """Retrieves the database password from Secret Manager."""
+    """Retrieves the database password from Secret Manager (cached for DB_PASSWORD_TTL_SECONDS)."""
+    if _DB_PW_CACHE["pw"] is not None and time.time() < _DB_PW_CACHE["exp"]:
+        return _DB_PW_CACHE["pw"]
     try:
         secret_version_path = secret_client.secret_version_path(PROJECT_ID, DB_SECRET_ID, "latest")
         response = secret_client.access_secret_version(request={"name": secret_version_path})
         pw = response.payload.data.decode("UTF-8")
+        _DB_PW_CACHE["pw"], _DB_PW_CACHE["exp"] = pw, time.time() + DB_PASSWORD_TTL_SECONDS
         return pw
     except Exception as e:
         _log_exception("get_db_password failed", request_id=getattr(g, "request_id", None))
@@ -162,23 +206,73 @@ def get_db_connection():
         _log_exception(f"get_db_connection failed {DB_HOST}:{DB_PORT} {DB_USER} {DB_NAME}", request_id=getattr(g, "request_id", None))
         raise e
 
+# --- Database Connection Pool ---
+# Idle connections are kept per process (gunicorn worker) and reused across requests;
+# one that sat idle longer than DB_POOL_PING_AFTER_SECONDS is pinged before reuse.
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_POOL_PING_AFTER_SECONDS = float(os.environ.get("DB_POOL_PING_AFTER_SECONDS", "30"))
+_db_pool = queue.LifoQueue()  # (conn, idle_since); most recently used first
 
-def submit_job(admin:bool = False):
-    app.logger.info("Received /submit | req=%s", g.request_id)
-    test_db_ip_connectivity()
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
 
-    def is_worker_busy(conn) -> bool:
-        cursor = conn.cursor()
+def _acquire_db_connection():
+    while True:
         try:
-            cursor.execute("SELECT is_busy FROM worker_state WHERE id = 'singleton'")
-            result = cursor.fetchone()
-            return result and result[0]
-        finally:
-            cursor.close()
+            conn, idle_since = _db_pool.get_nowait()
+        except queue.Empty:
+            return get_db_connection()
+        if time.time() - idle_since < DB_POOL_PING_AFTER_SECONDS:
+            return conn
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            conn.rollback()
+            return conn
+        except Exception:
+            _close_quietly(conn)
+
+def _release_db_connection(conn):
+    try:
+        conn.rollback()  # never hand an open transaction to the next request
+    except Exception:
+        _close_quietly(conn)
+        return
+    if _db_pool.qsize() < DB_POOL_SIZE:
+        _db_pool.put((conn, time.time()))
+    else:
+        _close_quietly(conn)
+
+def get_db():
+    """The request's pooled connection (g.db): checked out on first use, returned at teardown."""
+    if "db" not in g:
+        g.db = _acquire_db_connection()
+    return g.db
+
+@app.teardown_request
+def release_db(exc):
+    conn = g.pop("db", None)
+    if conn is not None:
+        _release_db_connection(conn)
+
+
+def _replayed_job(job_id: str):
+    app.logger.info("Idempotent replay of job %s | req=%s", job_id, g.request_id)
+    return jsonify({
+        "job_id": job_id,
+        "message": "Job already submitted. Check status via /status/{job_id}",
+        "request_id": g.request_id
+    }), 202
 
-    if is_worker_busy(get_db_connection()):
-        app.logger.warning("Worker is busy | req=%s", g.request_id)
-        return jsonify({"error": "Worker is busy", "request_id": g.request_id}), 503
+def submit_job(admin:bool = False):
+    app.logger.info("Received /submit | req=%s", g.request_id)
 
     client_payload = request.get_json(silent=True)
     if client_payload is None:
@@ -189,30 +283,70 @@ def submit_job(admin:bool = False):
         return jsonify({"error": "JSON body must be an object", "request_id": g.request_id}), 400
     if not admin:
         client_payload["model"] ="gemini-2.5-flash-lite"
-    job_id = f"job_{os.urandom(8).hex()}"
+    # a client retrying with the same Idempotency-Key gets the same job_id (and no second job)
+    idempotency_key = request.headers.get("Idempotency-Key")
+    if idempotency_key:
+        job_id = f"job_{hashlib.blake2b(idempotency_key.encode('utf-8'), digest_size=8).hexdigest()}"
+    else:
+        job_id = f"job_{secrets.token_hex(8)}"
     app.logger.info("Creating job_id=%s | req=%s", job_id, g.request_id)
 
-    message_for_pubsub = {
-        "job_id": job_id,
-        "client_payload": client_payload
-    }
-    message_data = json.dumps(message_for_pubsub).encode("utf-8")
-
-    if len(message_data) > 9_500_000:
-        app.logger.warning("Payload too large: %s bytes | job=%s req=%s", len(message_data), job_id, g.request_id)
-        return jsonify({"error": "Payload too large for Pub/Sub message (max 10MB)", "request_id": g.request_id}), 413
+    # serialized once: the same text is size-checked and stored
+    payload_json = _json_bytes(client_payload)
+    if len(payload_json) > 9_500_000:
+        app.logger.warning("Payload too large: %s bytes | job=%s req=%s", len(payload_json), job_id, g.request_id)
+        return jsonify({"error": "Payload too large (max 9.5MB)", "request_id": g.request_id}), 413
 
+    # One statement + COMMIT before the 202: the replay check, the busy check (FOR SHARE, so the
+    # worker can't flip the flag until we commit), the INSERT, and the worker's NOTIFY (delivered
+    # on commit, with the row). Nothing is inserted for a replayed job_id or a busy worker.
+    # Idempotency-Key submits first lock the key and look up an earlier job under it.
     conn = None
     try:
-        app.logger.info("Creating Connection")
-        conn = get_db_connection()
-        app.logger.info("Getting Cursor")
+        conn = get_db()
         cursor = conn.cursor()
-        app.logger.info("Executing")
+        if idempotency_key:
+            # concurrent retries of one key queue here until the first commits or rolls back,
+            # so the lookup below (fresh snapshot) sees its row and answers as a replay
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtextextended(%s, 0))", (job_id,))
+            # a reused key must come with the same body; only replays read the stored one back
+            cursor.execute("SELECT client_request_data FROM jobs WHERE job_id = %s", (job_id,))
+            row = cursor.fetchone()
+            if row is not None:
+                conn.rollback()
+                stored = row[0] if isinstance(row[0], dict) else json.loads(row[0] or "{}")
+                if stored != client_payload:
+                    app.logger.warning("Idempotency-Key reused with a different body for job %s | req=%s", job_id, g.request_id)
+                    return jsonify({
+                        "error": "Idempotency-Key was already used with a different request body",
+                        "request_id": g.request_id
+                    }), 422
+                return _replayed_job(job_id)
         cursor.execute(
-            "INSERT INTO jobs (job_id, status, client_request_data) VALUES (%s, %s, %s)",
-            (job_id, "PENDING", json.dumps(client_payload))
+            """
+            WITH busy AS (
+                SELECT is_busy FROM worker_state WHERE id = 'singleton' FOR SHARE
+            ), existing AS (
+                SELECT job_id FROM jobs WHERE job_id = %s
+            ), ins AS (
+                INSERT INTO jobs (job_id, status, client_request_data)
+                SELECT %s, 'PENDING', %s
+                 WHERE NOT EXISTS (SELECT 1 FROM existing)
+                   AND NOT COALESCE((SELECT is_busy FROM busy), FALSE)
+                RETURNING job_id
+            )
+            SELECT EXISTS (SELECT 1 FROM existing),
+                   (SELECT count(*) FROM (SELECT pg_notify(%s, job_id) FROM ins) AS notified)
+            """,
+            (job_id, job_id, payload_json.decode("utf-8"), JOB_NOTIFY_CHANNEL)
         )
+        replayed, inserted = cursor.fetchone()
+        if not inserted:
+            conn.rollback()
+            if replayed:
+                return _replayed_job(job_id)
+            app.logger.warning("Worker is busy | req=%s", g.request_id)
+            return jsonify({"error": "Worker is busy", "request_id": g.request_id}), 503
         conn.commit()
         app.logger.info("Job %s inserted into DB as PENDING | req=%s", job_id, g.request_id)
 
@@ -224,13 +358,6 @@ def submit_job(admin:bool = False):
             except Exception as rb_e:
                 _log_exception("Rollback failed", job_id=job_id, request_id=g.request_id)
         return jsonify(_err_payload(e, 500)), 500
-    finally:
-        if conn:
-            try:
-                conn.close()
-                app.logger.info("DB connection closed | job=%s req=%s", job_id, g.request_id)
-            except Exception as close_e:
-                _log_exception("DB close failed", job_id=job_id, request_id=g.request_id)
 
     return jsonify({
         "job_id": job_id,
@@ -252,11 +379,32 @@ def root_page():
         mimetype="text/html; charset=utf-8",
         max_age=0  # disable caching while iterating; bump later if needed
     )
+# /health checks the DB at most once per interval (SELECT 1 on a pooled connection), not per probe
+HEALTH_DB_CHECK_SECONDS = float(os.environ.get("HEALTH_DB_CHECK_SECONDS", "30"))
+_HEALTH_DB = {"ok": None, "checked": 0.0}
+
+def _db_healthy() -> bool:
+    now = time.time()
+    if _HEALTH_DB["ok"] is None or now - _HEALTH_DB["checked"] >= HEALTH_DB_CHECK_SECONDS:
+        _HEALTH_DB["checked"] = now
+        try:
+            cursor = get_db().cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            _HEALTH_DB["ok"] = True
+        except Exception:
+            _log_exception("Health DB check failed", request_id=getattr(g, "request_id", None))
+            _HEALTH_DB["ok"] = False
+    return _HEALTH_DB["ok"]
+
 @app.route("/health", methods=["GET"])
 def health():
-    test_db_ip_connectivity()
     app.logger.info("Health check | req=%s", g.request_id)
-    return jsonify({"status": "ok", "request_id": g.request_id}), 200
+    db_state = "ok" if _db_healthy() else "unreachable"
+    return jsonify({"status": "ok", "db": db_state, "request_id": g.request_id}), 200
 
 @app.route("/submit", methods=["POST"])
 def route_a():
@@ -265,9 +413,8 @@ def route_a():
 @app.route("/status/<job_id>", methods=["GET"])
 def get_job_status(job_id):
     app.logger.info("Received /status | job=%s req=%s", job_id, g.request_id)
-    conn = None
     try:
-        conn = get_db_connection()
+        conn = get_db()
         cursor = conn.cursor()
         cursor.execute(
             "SELECT status, result_url, error_message, created_at, updated_at FROM jobs WHERE job_id = %s",
@@ -293,13 +440,6 @@ def get_job_status(job_id):
     except Exception as e:
         _log_exception("Error fetching status", job_id=job_id, request_id=g.request_id)
         return jsonify(_err_payload(e, 500)), 500
-    finally:
-        if conn:
-            try:
-                conn.close()
-                app.logger.info("DB connection closed for status | job=%s req=%s", job_id, g.request_id)
-            except Exception as close_e:
-                _log_exception("DB close failed (status)", job_id=job_id, request_id=g.request_id)
 
 if __name__ == "__main__":
     # Dev-only: Cloud Run uses gunicorn via CMD